@@ -1,30 +1,287 @@
 """This is the main module."""
-import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Body
+import asyncio
+import json
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import (FastAPI, HTTPException, Depends, UploadFile, File, Body,
+                     Header)
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
 from configs.database_config import (DatabaseConfig, User, UserUpdate,
                                      Completions, ChatCompletions,
-                                     Embeddings, FineTunes)
+                                     Embeddings, FineTunes, Tokenize)
 from configs.service_config import ServiceConfig
 from configs.openai_config import OpenAIConfig
 from database_services.database_service import DatabaseService
-from openai_services.openai_service import OpenAIService
+from openai_services.openai_service import OpenAIService, upstream_user
+from openai_services.scheduler import CapacityError
+from openai_services.admission import AdmissionError
+from openai_services.fine_tune_tracker import FineTuneTracker
+from openai_services.passthrough import RawResponse
 
 from authentication_services.authentication_service import AuthenticationService
 from utils.http_exceptions import limit_exception, forbidden_exception
+from utils.http_utils import use_response_cache, etag_matches
+from utils.streaming import SettledStreamingResponse
+from utils.serving import serve
 
 
 service_config = ServiceConfig()
 database_config = DatabaseConfig()
-database = DatabaseService(database_config=database_config)
+database = DatabaseService(database_config=database_config,
+                           workers=service_config.workers)
 
 openai_config = OpenAIConfig()
-openai_service = OpenAIService(openai_config=openai_config)
+openai_service = OpenAIService(openai_config=openai_config,
+                               workers=service_config.workers)
 
 auth_service = AuthenticationService(database_service=database)
+
+fine_tune_tracker = None
+if openai_config.fine_tune_tracker:
+    fine_tune_tracker = FineTuneTracker(
+        retrieve=openai_service.poll_fine_tune,
+        store=database,
+        min_interval=openai_config.fine_tune_poll_min_interval,
+        max_interval=openai_config.fine_tune_poll_max_interval,
+        concurrency=openai_config.fine_tune_poll_concurrency,
+        sync_interval=openai_config.fine_tune_sync_interval,
+        lease_ttl=openai_config.fine_tune_lease_ttl)
+
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI):
+    """Set up services on startup and drain them on shutdown"""
+    await database.start()
+    await openai_service.start()
+    if fine_tune_tracker is not None:
+        await fine_tune_tracker.start()
+    yield
+    if fine_tune_tracker is not None:
+        await fine_tune_tracker.stop()
+    await openai_service.close()
+    await database.close()
+
 app = FastAPI(docs_url=service_config.url_swagger,
-              redoc_url=service_config.url_redoc)
+              redoc_url=service_config.url_redoc,
+              lifespan=lifespan)
+
+async def check_model(model: str):
+    """Reject models missing from the model catalog
+
+    Args:
+        model (str): Model id of the request.
+
+    Raises:
+        HTTPException: 404 when the model does not exist.
+
+    """
+    if not await openai_service.model_catalog.has_model(model):
+        raise HTTPException(status_code=404,
+                            detail=f"The model `{model}` does not exist.")
+
+async def record_usage(user_info: dict, endpoint: str, usage: dict=None):
+    """Charge usage budgets of the user and add the time-series record
+
+    Users without budgets cost no database write here, the usage is part of
+    the time-series record queued on the background writer.
+
+    Args:
+        user_info (dict): Data of the requesting user.
+        endpoint (str): Endpoint name used for the time-series record.
+        usage (dict): Tokens and spend of the request.
+
+    Returns:
+        None
+
+    """
+    if usage:
+        await database.charge_usage(hashed_api_key=user_info['api_key'],
+                                    usage=usage, user=user_info)
+    await database.add_request_ts_record(user_info['user_id'],
+                                         endpoint=endpoint, usage=usage)
+
+def upstream_exception(exception: Exception):
+    """Map an error of an upstream call to the HTTP error of the client
+
+    Args:
+        exception (Exception): Error raised by the openai service.
+
+    Returns:
+        HTTPException: 429 with Retry-After when the upstream rate limits
+            are used up, 503 otherwise, with Retry-After when capacity ran
+            out.
+
+    """
+    if isinstance(exception, AdmissionError):
+        return HTTPException(
+            status_code=429, detail=str(exception),
+            headers={"Retry-After": str(math.ceil(exception.retry_after))})
+    if isinstance(exception, CapacityError):
+        return HTTPException(
+            status_code=503, detail=str(exception),
+            headers={"Retry-After": str(int(exception.retry_after))})
+    return HTTPException(status_code=503, detail=str(exception))
+
+async def stream_events(openai_result, completion: list):
+    """Forward upstream stream chunks to the client as server-sent events.
+
+    Args:
+        openai_result (AsyncGenerator): Stream returned by openai.
+        completion (list): Collects the generated text of each chunk.
+
+    Yields:
+        str: Server-sent event lines.
+
+    """
+    try:
+        async for chunk in openai_result:
+            completion.append(openai_service.metering.chunk_text(chunk))
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+    except Exception as exception:
+        error = {"error": {"message": str(exception)}}
+        yield f"data: {json.dumps(error)}\n\n"
+
+async def settle_stream(events, openai_result, user_info: dict,
+                        endpoint: str, payload: dict, completion: list):
+    """Close a finished stream and settle its accounting.
+
+    The request limit is reserved before the stream starts. It is refunded
+    if no chunk arrived from upstream, otherwise usage is counted locally
+    and recorded. The upstream slot of the stream is held until then.
+
+    Args:
+        events (AsyncGenerator): Server-sent events sent to the client.
+        openai_result (AsyncGenerator): Stream returned by openai.
+        user_info (dict): Data of the requesting user.
+        endpoint (str): Endpoint name used for the time-series record.
+        payload (dict): Request payload, used to count prompt tokens.
+        completion (list): Generated text of each received chunk.
+
+    Returns:
+        None
+
+    """
+    # The client may have left before or while the stream was read
+    for stream in (events, openai_result):
+        try:
+            await stream.aclose()
+        except Exception:
+            pass
+    openai_service.release_slot(user_info)
+
+    if completion:
+        usage = await openai_service.metering.ameasure_stream(
+            payload, "".join(completion))
+        await record_usage(user_info, endpoint, usage)
+    else:
+        await database.refund_request_limit(
+            hashed_api_key=user_info['api_key'])
+
+def stream_response(openai_result, user_info: dict, endpoint: str,
+                    payload: dict):
+    """Wrap an upstream stream into an SSE response."""
+    completion = []
+    events = stream_events(openai_result, completion)
+    return SettledStreamingResponse(
+        events,
+        settle=lambda: settle_stream(events, openai_result, user_info,
+                                     endpoint, payload, completion),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def upstream_response(openai_result):
+    """Forward a raw upstream response as received, other results as is"""
+    if isinstance(openai_result, RawResponse):
+        return Response(content=openai_result.body,
+                        status_code=openai_result.status,
+                        headers=openai_result.headers,
+                        media_type="application/json")
+    return openai_result
+
+def listing_response(openai_result, etag: str=None,
+                     if_none_match: str=None):
+    """Answer a listing request, 304 if the client copy is current
+
+    Args:
+        openai_result (dict): The listing.
+        etag (str): ETag of the listing, None if it is not cached.
+        if_none_match (str): Value of the If-None-Match header.
+
+    Returns:
+        Response: The listing with its ETag, or an empty 304.
+
+    """
+    if etag is None:
+        return openai_result
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=openai_result, headers=headers)
+
+async def tracked_fine_tune(fine_tune_id: str, since: int=0,
+                            timeout: float=0.0):
+    """Get a tracked fine-tune job once newer than since
+
+    Args:
+        fine_tune_id (str): id of the fine-tuning process.
+        since (int): Revision the client already has.
+        timeout (float): Max seconds to wait for a newer revision.
+
+    Returns:
+        dict: revision and state of the job.
+
+    """
+    if fine_tune_tracker is not None:
+        result = await fine_tune_tracker.wait(fine_tune_id, since, timeout)
+        if result is None:
+            raise HTTPException(status_code=404,
+                                detail="Fine-tune is not tracked.")
+        return {"revision": result[0], "fine_tune": result[1]}
+
+    result = await database.retrieve_fine_tune(fine_tune_id)
+    if result['acknowledged'] is False:
+        raise HTTPException(status_code=result['status_code'],
+                            detail=result['message'])
+    return {"revision": result['data']['revision'],
+            "fine_tune": result['data']['fine_tune']}
+
+async def fine_tune_events(fine_tune_id: str, since: int=0):
+    """Push changes of a fine-tune job as server-sent events
+
+    Args:
+        fine_tune_id (str): id of the fine-tuning process.
+        since (int): Revision the client already has.
+
+    Yields:
+        str: Server-sent event lines.
+
+    """
+    try:
+        if fine_tune_tracker is not None:
+            found = False
+            async for revision, fine_tune in fine_tune_tracker.subscribe(
+                    fine_tune_id, since):
+                found = True
+                if revision == since:
+                    yield ": keep-alive\n\n"
+                    continue
+                since = revision
+                event = {"revision": revision, "fine_tune": fine_tune}
+                yield f"data: {json.dumps(event)}\n\n"
+            if not found:
+                raise HTTPException(status_code=404,
+                                    detail="Fine-tune is not tracked.")
+        else:
+            event = await tracked_fine_tune(fine_tune_id)
+            if event["revision"] > since:
+                yield f"data: {json.dumps(event)}\n\n"
+        yield "data: [DONE]\n\n"
+    except HTTPException as exception:
+        error = {"error": {"message": exception.detail}}
+        yield f"data: {json.dumps(error)}\n\n"
 
 @app.post("/admin/token")
 async def login(form_data: OAuth2PasswordRequestForm=Depends()):
@@ -69,6 +326,7 @@ async def update(user: UserUpdate):
     
     """
     result = await database.edit_user(user)
+    auth_service.invalidate_user(user.user_id)
     if result['acknowledged'] is False:
         raise HTTPException(status_code=result['status_code'],
                             detail=result['message'])
@@ -123,6 +381,7 @@ async def delete_user(user_id: str):
 
     """
     result = await database.delete_user(user_id, 'user_id')
+    auth_service.invalidate_user(user_id)
     if result['acknowledged'] is False:
         raise HTTPException(status_code=result['status_code'],
                             detail=result['message'])
@@ -152,6 +411,46 @@ async def get_record(user_id: str, endpoint: str, day_from: float,
                                          slice=slice)
     return result
 
+@app.get("/admin/metrics",
+         dependencies=[Depends(auth_service.validate_token)])
+async def get_metrics():
+    """Get internal metrics of the service
+
+    Args:
+        None
+
+    Returns:
+        dict: metrics of caches and background components.
+
+    """
+    return {
+        "api_key_cache": auth_service.api_key_cache.stats(),
+        "ts_writer": database.ts_writer.stats(),
+        "user_invalidations": database.user_invalidations.stats(),
+        "quota_engine": database.quota_engine.stats() \
+                        if database.quota_engine else None,
+        "model_catalog": openai_service.model_catalog.stats(),
+        "embedding_cache": openai_service.embedding_cache.stats() \
+                           if openai_service.embedding_cache else None,
+        "embedding_batcher": openai_service.embedding_batcher.stats() \
+                             if openai_service.embedding_batcher else None,
+        "response_cache": openai_service.response_cache.stats() \
+                          if openai_service.response_cache else None,
+        "single_flight": openai_service.single_flight.stats() \
+                         if openai_service.single_flight else None,
+        "http_transport": openai_service.transport.stats(),
+        "key_pool": openai_service.key_pool.stats(),
+        "retry_policy": openai_service.retry_policy.stats(),
+        "scheduler": openai_service.scheduler.stats() \
+                     if openai_service.scheduler else None,
+        "admission": openai_service.admission.stats() \
+                     if openai_service.admission else None,
+        "listing_cache": openai_service.listing_cache.stats() \
+                         if openai_service.listing_cache else None,
+        "fine_tune_tracker": fine_tune_tracker.stats() \
+                             if fine_tune_tracker else None
+    }
+
 @app.get("/get")
 async def retrieve_user(user_info: str=Depends(auth_service.api_key_auth)):
     """Get user in database
@@ -163,64 +462,128 @@ async def retrieve_user(user_info: str=Depends(auth_service.api_key_auth)):
         dict: result of user data in database.
     
     """
-    user_info.pop("api_key")
-    return user_info
+    # Read from the database, the verified user may be cached with stale
+    # limits
+    await database.flush_quota(user_info['api_key'])
+    result = await database.retrieve_user(user_info['user_id'], 'user_id')
+    if result['acknowledged'] is False:
+        raise HTTPException(status_code=result['status_code'],
+                            detail=result['message'])
+    return result['data']
 
 @app.post("/v1/completions")
 async def completions(completions_args: Completions,
-                      user_info: str=Depends(auth_service.api_key_auth)):
+                      user_info: str=Depends(auth_service.api_key_auth),
+                      cache_control: str=Header(None)):
     """Get completions API
 
     Args:
         completions_args (Completion): Input Completion data.
+        cache_control (str): `no-cache` or `no-store` bypasses the
+            response cache and in-flight request sharing.
 
     Returns:
         OpenAIResult.
     
     """
-    if user_info['request_limit'] == 0:
-        raise limit_exception
-
     if not user_info['permissions']['text_completion_models']:
         raise forbidden_exception
+    await check_model(completions_args.model)
 
+    result = await database.reserve_request_limit(
+        hashed_api_key=user_info['api_key'])
+    if result['acknowledged'] is False:
+        raise limit_exception
+
+    openai_result = None
+    slot = False
+    upstream_user.set(user_info)
     try:
-        openai_result = openai_service.completions(
+        # Streams hold a slot until the last chunk, other calls take one
+        # only if they are not served from a cache
+        if completions_args.stream:
+            await openai_service.acquire_slot(user_info)
+            slot = True
+        openai_result = await openai_service.completions(
+            use_cache=use_response_cache(cache_control),
             **completions_args.dict(exclude_unset=True))
-        await database.update_request_limit(hashed_api_key=user_info['api_key'])
-        await database.add_request_ts_record(user_info['user_id'],
-                                             endpoint="completions")
     except Exception as exception:
-        raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+        await database.refund_request_limit(hashed_api_key=user_info['api_key'])
+        raise upstream_exception(exception)
+    except asyncio.CancelledError:
+        await asyncio.shield(database.refund_request_limit(
+            hashed_api_key=user_info['api_key']))
+        raise
+    finally:
+        if slot and openai_result is None:
+            openai_service.release_slot(user_info)
+
+    if completions_args.stream:
+        return stream_response(openai_result, user_info,
+                               endpoint="completions",
+                               payload=completions_args.dict())
+
+    usage = openai_service.metering.measure(completions_args.model,
+                                            openai_result)
+    await record_usage(user_info, endpoint="completions", usage=usage)
+    return upstream_response(openai_result)
 
 @app.post("/v1/chat/completions")
 async def chat_completions(chat_completions_args: ChatCompletions,
-                           user_info: str=Depends(auth_service.api_key_auth)):
+                           user_info: str=Depends(auth_service.api_key_auth),
+                           cache_control: str=Header(None)):
     """Get completions API
 
     Args:
         chat_completions_args (ChatCompletions): Input ChatCompletions data.
+        cache_control (str): `no-cache` or `no-store` bypasses the
+            response cache and in-flight request sharing.
 
     Returns:
         OpenAIResult.
     
     """
-    if user_info['request_limit'] == 0:
-        raise limit_exception
-
     if not user_info['permissions']['chat_completion_models']:
         raise forbidden_exception
+    await check_model(chat_completions_args.model)
 
+    result = await database.reserve_request_limit(
+        hashed_api_key=user_info['api_key'])
+    if result['acknowledged'] is False:
+        raise limit_exception
+
+    openai_result = None
+    slot = False
+    upstream_user.set(user_info)
     try:
-        openai_result = openai_service.chat_completions(
+        # Streams hold a slot until the last chunk, other calls take one
+        # only if they are not served from a cache
+        if chat_completions_args.stream:
+            await openai_service.acquire_slot(user_info)
+            slot = True
+        openai_result = await openai_service.chat_completions(
+            use_cache=use_response_cache(cache_control),
             **chat_completions_args.dict(exclude_unset=True))
-        await database.update_request_limit(hashed_api_key=user_info['api_key'])
-        await database.add_request_ts_record(user_info['user_id'],
-                                             endpoint="chat_completions")
     except Exception as exception:
-        raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+        await database.refund_request_limit(hashed_api_key=user_info['api_key'])
+        raise upstream_exception(exception)
+    except asyncio.CancelledError:
+        await asyncio.shield(database.refund_request_limit(
+            hashed_api_key=user_info['api_key']))
+        raise
+    finally:
+        if slot and openai_result is None:
+            openai_service.release_slot(user_info)
+
+    if chat_completions_args.stream:
+        return stream_response(openai_result, user_info,
+                               endpoint="chat_completions",
+                               payload=chat_completions_args.dict())
+
+    usage = openai_service.metering.measure(chat_completions_args.model,
+                                            openai_result)
+    await record_usage(user_info, endpoint="chat_completions", usage=usage)
+    return upstream_response(openai_result)
 
 @app.post("/v1/embeddings")
 async def embeddings(embeddings_args: Embeddings,
@@ -234,21 +597,53 @@ async def embeddings(embeddings_args: Embeddings,
         OpenAIResult.
 
     """
-    if user_info['request_limit'] == 0:
-        raise limit_exception
-    
     if not user_info['permissions']['embeddings']:
         raise forbidden_exception
+    await check_model(embeddings_args.model)
+
+    result = await database.reserve_request_limit(
+        hashed_api_key=user_info['api_key'])
+    if result['acknowledged'] is False:
+        raise limit_exception
 
+    upstream_user.set(user_info)
     try:
-        openai_result = openai_service.embeddings(
+        openai_result = await openai_service.embeddings(
             **embeddings_args.dict(exclude_unset=True))
-        await database.update_request_limit(hashed_api_key=user_info['api_key'])
-        await database.add_request_ts_record(user_info['user_id'],
-                                             endpoint="embeddings")
     except Exception as exception:
-        raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+        await database.refund_request_limit(hashed_api_key=user_info['api_key'])
+        raise upstream_exception(exception)
+    except asyncio.CancelledError:
+        await asyncio.shield(database.refund_request_limit(
+            hashed_api_key=user_info['api_key']))
+        raise
+
+    usage = openai_service.metering.measure(embeddings_args.model,
+                                            openai_result)
+    await record_usage(user_info, endpoint="embeddings", usage=usage)
+    return upstream_response(openai_result)
+
+@app.post("/v1/tokenize")
+async def tokenize(tokenize_args: Tokenize,
+                   user_info: str=Depends(auth_service.api_key_auth)):
+    """Count tokens locally API
+
+    Args:
+        tokenize_args (Tokenize): Input Tokenize data.
+
+    Returns:
+        dict: token counts of prompts and messages.
+
+    """
+    if tokenize_args.prompt is None and tokenize_args.messages is None:
+        raise HTTPException(status_code=422,
+                            detail="Provide prompt or messages.")
+
+    try:
+        return await openai_service.count_tokens(
+            **tokenize_args.dict())
+    except Exception as exception:
+        raise HTTPException(status_code=400, detail=str(exception))
 
 @app.post("/v1/files")
 async def upload_files(purpose: str=Body(..., embed=True),
@@ -268,20 +663,23 @@ async def upload_files(purpose: str=Body(..., embed=True),
 
     try:
         upload_files_dict = {}
-        upload_files_dict['file'] = file.file.read()
+        upload_files_dict['file'] = file.file
         upload_files_dict['user_provided_filename'] = file.filename
         upload_files_dict['purpose'] = purpose
-        openai_result = openai_service.upload_files(**upload_files_dict)
+        openai_result = await openai_service.upload_files(**upload_files_dict)
+    except ValueError as exception:
+        raise HTTPException(status_code=400, detail=str(exception))
     except Exception as exception:
         raise HTTPException(status_code=503, detail=str(exception))
     return openai_result
 
 @app.get("/v1/files")
-async def list_files(user_info: str=Depends(auth_service.api_key_auth)):
+async def list_files(user_info: str=Depends(auth_service.api_key_auth),
+                     if_none_match: str=Header(None)):
     """Get list of uploaded files API
 
     Args:
-        None
+        if_none_match (str): ETag of the listing the client holds.
 
     Returns:
         OpenAIResult.
@@ -291,10 +689,10 @@ async def list_files(user_info: str=Depends(auth_service.api_key_auth)):
         raise forbidden_exception
 
     try:
-        openai_result = openai_service.list_files()
+        openai_result, etag = await openai_service.list_files()
     except Exception as exception:
         raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+    return listing_response(openai_result, etag, if_none_match)
 
 @app.post("/v1/fine-tunes")
 async def fine_tunes(fine_tunes_args: FineTunes,
@@ -308,29 +706,39 @@ async def fine_tunes(fine_tunes_args: FineTunes,
         OpenAIResult.
 
     """
-    if user_info['fine_tune_limit'] == 0:
-        raise limit_exception
-
     if not user_info['permissions']['fine_tune']:
         raise forbidden_exception
 
+    result = await database.reserve_finetune_limit(
+        hashed_api_key=user_info['api_key'])
+    if result['acknowledged'] is False:
+        raise limit_exception
+
     try:
-        openai_result = openai_service.fine_tunes(
+        openai_result = await openai_service.fine_tunes(
             **fine_tunes_args.dict(exclude_unset=True))
-        await database.update_finetune_limit(hashed_api_key=user_info['api_key'])
-        await database.add_request_ts_record(user_info['user_id'],
-                                             endpoint="fine_tunes")
     except Exception as exception:
+        await database.refund_finetune_limit(
+            hashed_api_key=user_info['api_key'])
         raise HTTPException(status_code=503, detail=str(exception))
+
+    if fine_tune_tracker is not None:
+        await fine_tune_tracker.track(
+            openai_result['id'], user_info['user_id'],
+            fine_tune=openai_result.to_dict_recursive())
+    await database.add_request_ts_record(user_info['user_id'],
+                                         endpoint="fine_tunes")
     return openai_result
 
 @app.get("/v1/fine-tunes/{fine_tune_id}")
 async def retrieve_fine_tune(fine_tune_id: str,
-                             user_info: dict=Depends(auth_service.api_key_auth)):
+                             user_info: dict=Depends(auth_service.api_key_auth),
+                             if_none_match: str=Header(None)):
     """Retrieve a finetuning process API
 
     Args:
         fine_tune_id (str): id of the fine-tuning process.
+        if_none_match (str): ETag of the process the client holds.
 
     Returns:
         OpenAIResult.
@@ -340,10 +748,54 @@ async def retrieve_fine_tune(fine_tune_id: str,
         raise forbidden_exception
 
     try:
-        openai_result = openai_service.retrieve_fine_tune(fine_tune_id)
+        openai_result, etag = await openai_service.retrieve_fine_tune(
+            fine_tune_id)
     except Exception as exception:
         raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+    return listing_response(openai_result, etag, if_none_match)
+
+@app.get("/v1/fine-tunes/{fine_tune_id}/watch")
+async def watch_fine_tune(fine_tune_id: str, since: int=0,
+                          timeout: float=30.0,
+                          user_info: dict=Depends(auth_service.api_key_auth)):
+    """Long-poll a tracked fine-tuning process API
+
+    Args:
+        fine_tune_id (str): id of the fine-tuning process.
+        since (int): Revision the client already has.
+        timeout (float): Max seconds to wait for a newer revision.
+
+    Returns:
+        dict: revision and state of the fine-tuning process.
+
+    """
+    if not user_info['permissions']['fine_tune']:
+        raise forbidden_exception
+
+    return await tracked_fine_tune(fine_tune_id, since,
+                                   min(max(timeout, 0.0), 60.0))
+
+@app.get("/v1/fine-tunes/{fine_tune_id}/subscribe")
+async def subscribe_fine_tune(fine_tune_id: str, since: int=0,
+                              user_info: dict=Depends(
+                                  auth_service.api_key_auth)):
+    """Subscribe to changes of a tracked fine-tuning process API
+
+    Args:
+        fine_tune_id (str): id of the fine-tuning process.
+        since (int): Revision the client already has.
+
+    Returns:
+        StreamingResponse: server-sent events, one per revision.
+
+    """
+    if not user_info['permissions']['fine_tune']:
+        raise forbidden_exception
+
+    return StreamingResponse(
+        fine_tune_events(fine_tune_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/v1/fine-tunes/{fine_tune_id}/cancel")
 async def cancel_fine_tune(fine_tune_id: str,
@@ -361,9 +813,11 @@ async def cancel_fine_tune(fine_tune_id: str,
         raise forbidden_exception
 
     try:
-        openai_result = openai_service.cancel_fine_tune(fine_tune_id)
-        await database.update_finetune_limit(hashed_api_key=user_info['api_key'],
-                                             cost=-1)
+        openai_result = await openai_service.cancel_fine_tune(fine_tune_id)
+        if fine_tune_tracker is not None:
+            await fine_tune_tracker.track(fine_tune_id)
+        await database.refund_finetune_limit(
+            hashed_api_key=user_info['api_key'])
         await database.add_request_ts_record(user_id=user_info['user_id'],
                                              endpoint="fine_tunes",
                                              cost=-1)
@@ -372,11 +826,12 @@ async def cancel_fine_tune(fine_tune_id: str,
     return openai_result
 
 @app.get("/v1/fine-tunes")
-async def list_fine_tunes(user_info: str=Depends(auth_service.api_key_auth)):
+async def list_fine_tunes(user_info: str=Depends(auth_service.api_key_auth),
+                          if_none_match: str=Header(None)):
     """Get list of fine-tuned models API
 
     Args:
-        None
+        if_none_match (str): ETag of the listing the client holds.
 
     Returns:
         OpenAIResult.
@@ -386,11 +841,11 @@ async def list_fine_tunes(user_info: str=Depends(auth_service.api_key_auth)):
         raise forbidden_exception
 
     try:
-        openai_result = openai_service.list_fine_tunes()
+        openai_result, etag = await openai_service.list_fine_tunes()
     except Exception as exception:
         raise HTTPException(status_code=503, detail=str(exception))
-    return openai_result
+    return listing_response(openai_result, etag, if_none_match)
 
 
 if __name__ == "__main__":
-   uvicorn.run("app:app", host=service_config.host, port=service_config.port)
+   serve(app, service_config)
@@ -9,7 +9,9 @@ from pydantic import ValidationError
 
 from logger.ve_logger import VeLogger
 from configs.authentication_config import AuthenticationConfig
-from utils.database_utils import create_access_token, create_refresh_token
+from utils.database_utils import (create_access_token, create_refresh_token,
+                                  hash_api_key)
+from utils.lru_cache import TTLCache
 
 
 class AuthenticationService:
@@ -30,6 +32,14 @@ class AuthenticationService:
 
         self.auth_config = AuthenticationConfig()
 
+        # Verified user documents keyed by hashed API key
+        self.api_key_cache = TTLCache(
+            max_size=self.auth_config.api_key_cache_size,
+            ttl=self.auth_config.api_key_cache_ttl)
+        # Users edited through another worker
+        self.database.user_invalidations.add_listener(
+            lambda user_id, discard: self.invalidate_user(user_id))
+
     def _get_api_key(self, authorization: str):
         """Get the API key"""
         if authorization is None or not authorization.startswith("Bearer "):
@@ -44,14 +54,31 @@ class AuthenticationService:
             api_key: API key provided in the header.
 
         """
-        api_key = self._get_api_key(api_key)
-        result = await self.database.verify_api_key(token=api_key)
-        if result['acknowledged'] is False:
-            raise HTTPException(status_code=result['status_code'],
-                                detail=result['message'])
-        else:
+        hashed_api_key = hash_api_key(self._get_api_key(api_key))
+        result = self.api_key_cache.get(hashed_api_key)
+        if result is None:
+            result = await self.database.verify_hashed_api_key(
+                hashed_token=hashed_api_key)
+            if result['acknowledged'] is False:
+                raise HTTPException(status_code=result['status_code'],
+                                    detail=result['message'])
             result.pop('acknowledged')
-            return result
+            self.api_key_cache.set(hashed_api_key, result)
+
+        return dict(result)
+
+    def invalidate_user(self, user_id: str):
+        """Drop cached API key verification of a user
+
+        Args:
+            user_id (str): ID of the user whose data changed.
+
+        Returns:
+            None
+
+        """
+        self.api_key_cache.pop_where(
+            lambda result: result['user_id'] == user_id)
 
     async def validate_token(self, token: str=Security(oauth2_scheme)):
         """Validate API key provided"""
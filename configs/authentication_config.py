@@ -6,6 +6,11 @@ class AuthenticationConfig:
     """Necessary configs for Authentication.
 
     Attributes:
+        api_key_cache_size (int): Max number of verified API keys kept in
+            memory.
+        api_key_cache_ttl (float): Seconds a verified API key stays cached.
+            Edited users are dropped from the caches of all workers within
+            `DB_INVALIDATION_INTERVAL` anyway.
 
     """
     jwt_secret_key = str(os.getenv("JWT_SECRET_KEY")) \
@@ -20,12 +25,18 @@ class AuthenticationConfig:
     refresh_token_expire_minute = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTE")) \
                                   if os.getenv("REFRESH_TOKEN_EXPIRE_MINUTE") \
                                   else 60*24*7
+    api_key_cache_size = int(os.getenv("API_KEY_CACHE_SIZE")) \
+                         if os.getenv("API_KEY_CACHE_SIZE") else 10000
+    api_key_cache_ttl = float(os.getenv("API_KEY_CACHE_TTL")) \
+                        if os.getenv("API_KEY_CACHE_TTL") else 60.0
 
     def __init__(self, jwt_secret_key: str=None,
                  jwt_refresh_secret_key: str=None,
                  jwt_algorithm: str=None,
                  access_token_expire_minute: int=None,
-                 refresh_token_expire_minute: int=None) -> None:
+                 refresh_token_expire_minute: int=None,
+                 api_key_cache_size: int=None,
+                 api_key_cache_ttl: float=None) -> None:
         if jwt_secret_key:
             self.jwt_secret_key = jwt_secret_key
         if jwt_refresh_secret_key:
@@ -36,3 +47,7 @@ class AuthenticationConfig:
             self.access_token_expire_minute = access_token_expire_minute
         if refresh_token_expire_minute:
             self.refresh_token_expire_minute = refresh_token_expire_minute
+        if api_key_cache_size:
+            self.api_key_cache_size = api_key_cache_size
+        if api_key_cache_ttl:
+            self.api_key_cache_ttl = api_key_cache_ttl
@@ -13,6 +13,35 @@ class DatabaseConfig:
         url [required] (str): Database URL.
         db_name (str): Database name.
         db_user_collection (str): Collection name for users.
+        db_fine_tune_collection (str): Collection name for tracked
+            fine-tune jobs.
+        db_lease_collection (str): Collection name for the leases electing
+            the worker that runs a singleton background task.
+        db_ts_batch_size (int): Max time-series records per insert_many.
+        db_ts_flush_interval (float): Max seconds a time-series record waits
+            before it is written.
+        db_ts_queue_size (int): Max time-series records waiting to be
+            written. Records are dropped when the queue is full.
+        db_ts_write_concern (str): Write concern `w` of time-series writes,
+            a number or "majority".
+        db_quota_write_behind (bool): Enforce limits in memory and flush
+            spent quota to the database periodically.
+        db_quota_flush_interval (float): Seconds between two quota flushes.
+        db_quota_overspend_tolerance (int): Max unflushed spend of a key
+            over all workers, each worker flushes a key right away once its
+            unflushed spend reaches its share.
+        db_invalidation_collection (str): Collection name for invalidations
+            of cached user data, shared by all workers.
+        db_invalidation_interval (float): Seconds between two reads of the
+            invalidations by each worker.
+        db_bootstrap_indexes (bool): Create missing indexes at startup.
+        db_max_pool_size (int): Max connections in the Motor pool.
+        db_min_pool_size (int): Min connections kept in the Motor pool.
+        db_server_selection_timeout_ms (int): Server selection timeout.
+        db_connect_timeout_ms (int): Connect timeout.
+        db_socket_timeout_ms (int): Socket timeout, 0 disables it.
+        db_compressors (str): Comma separated wire compressors, e.g.
+            "zstd,snappy,zlib".
 
     """
     db_url = str(os.getenv("DB_URL")) \
@@ -25,11 +54,70 @@ class DatabaseConfig:
                          if os.getenv("DB_ADMIN_COLLECYION") else "Admin"
     db_ts_collection = str(os.getenv("DB_TS_COLLECTION")) \
                        if os.getenv("DB_TS_COLLECYION") else "ts"
+    db_fine_tune_collection = str(os.getenv("DB_FINE_TUNE_COLLECTION")) \
+                              if os.getenv("DB_FINE_TUNE_COLLECTION") \
+                              else "fine_tunes"
+    db_lease_collection = str(os.getenv("DB_LEASE_COLLECTION")) \
+                          if os.getenv("DB_LEASE_COLLECTION") else "leases"
+    db_ts_batch_size = int(os.getenv("DB_TS_BATCH_SIZE")) \
+                       if os.getenv("DB_TS_BATCH_SIZE") else 500
+    db_ts_flush_interval = float(os.getenv("DB_TS_FLUSH_INTERVAL")) \
+                           if os.getenv("DB_TS_FLUSH_INTERVAL") else 1.0
+    db_ts_queue_size = int(os.getenv("DB_TS_QUEUE_SIZE")) \
+                       if os.getenv("DB_TS_QUEUE_SIZE") else 100000
+    db_ts_write_concern = str(os.getenv("DB_TS_WRITE_CONCERN")) \
+                          if os.getenv("DB_TS_WRITE_CONCERN") else "1"
+    db_quota_write_behind = bool(os.getenv("DB_QUOTA_WRITE_BEHIND") == 'true') \
+                            if os.getenv("DB_QUOTA_WRITE_BEHIND") else False
+    db_quota_flush_interval = float(os.getenv("DB_QUOTA_FLUSH_INTERVAL")) \
+                              if os.getenv("DB_QUOTA_FLUSH_INTERVAL") else 1.0
+    db_quota_overspend_tolerance = \
+        int(os.getenv("DB_QUOTA_OVERSPEND_TOLERANCE")) \
+        if os.getenv("DB_QUOTA_OVERSPEND_TOLERANCE") else 100
+    db_invalidation_collection = str(os.getenv("DB_INVALIDATION_COLLECTION")) \
+                                 if os.getenv("DB_INVALIDATION_COLLECTION") \
+                                 else "invalidations"
+    db_invalidation_interval = float(os.getenv("DB_INVALIDATION_INTERVAL")) \
+                               if os.getenv("DB_INVALIDATION_INTERVAL") \
+                               else 1.0
+    db_bootstrap_indexes = bool(os.getenv("DB_BOOTSTRAP_INDEXES") != 'false') \
+                           if os.getenv("DB_BOOTSTRAP_INDEXES") else True
+    db_max_pool_size = int(os.getenv("DB_MAX_POOL_SIZE")) \
+                       if os.getenv("DB_MAX_POOL_SIZE") else 100
+    db_min_pool_size = int(os.getenv("DB_MIN_POOL_SIZE")) \
+                       if os.getenv("DB_MIN_POOL_SIZE") else 0
+    db_server_selection_timeout_ms = \
+        int(os.getenv("DB_SERVER_SELECTION_TIMEOUT_MS")) \
+        if os.getenv("DB_SERVER_SELECTION_TIMEOUT_MS") else 30000
+    db_connect_timeout_ms = int(os.getenv("DB_CONNECT_TIMEOUT_MS")) \
+                            if os.getenv("DB_CONNECT_TIMEOUT_MS") else 20000
+    db_socket_timeout_ms = int(os.getenv("DB_SOCKET_TIMEOUT_MS")) \
+                           if os.getenv("DB_SOCKET_TIMEOUT_MS") else 0
+    db_compressors = str(os.getenv("DB_COMPRESSORS")) \
+                     if os.getenv("DB_COMPRESSORS") else None
 
     def __init__(self, db_url: str=None, db_name: str=None,
                  db_user_collection: str=None,
                  db_admin_collection: str=None,
-                 db_ts_collection: str=None) -> None:
+                 db_ts_collection: str=None,
+                 db_fine_tune_collection: str=None,
+                 db_lease_collection: str=None,
+                 db_ts_batch_size: int=None,
+                 db_ts_flush_interval: float=None,
+                 db_ts_queue_size: int=None,
+                 db_ts_write_concern: str=None,
+                 db_quota_write_behind: bool=None,
+                 db_quota_flush_interval: float=None,
+                 db_quota_overspend_tolerance: int=None,
+                 db_invalidation_collection: str=None,
+                 db_invalidation_interval: float=None,
+                 db_bootstrap_indexes: bool=None,
+                 db_max_pool_size: int=None,
+                 db_min_pool_size: int=None,
+                 db_server_selection_timeout_ms: int=None,
+                 db_connect_timeout_ms: int=None,
+                 db_socket_timeout_ms: int=None,
+                 db_compressors: str=None) -> None:
         if db_url:
             self.db_url = db_url
         if db_name:
@@ -40,6 +128,43 @@ class DatabaseConfig:
             self.db_admin_collection = db_admin_collection
         if db_ts_collection:
             self.db_ts_collection = db_ts_collection
+        if db_fine_tune_collection:
+            self.db_fine_tune_collection = db_fine_tune_collection
+        if db_lease_collection:
+            self.db_lease_collection = db_lease_collection
+        if db_ts_batch_size:
+            self.db_ts_batch_size = db_ts_batch_size
+        if db_ts_flush_interval:
+            self.db_ts_flush_interval = db_ts_flush_interval
+        if db_ts_queue_size:
+            self.db_ts_queue_size = db_ts_queue_size
+        if db_ts_write_concern:
+            self.db_ts_write_concern = db_ts_write_concern
+        if db_quota_write_behind:
+            self.db_quota_write_behind = db_quota_write_behind
+        if db_quota_flush_interval:
+            self.db_quota_flush_interval = db_quota_flush_interval
+        if db_quota_overspend_tolerance:
+            self.db_quota_overspend_tolerance = db_quota_overspend_tolerance
+        if db_invalidation_collection:
+            self.db_invalidation_collection = db_invalidation_collection
+        if db_invalidation_interval:
+            self.db_invalidation_interval = db_invalidation_interval
+        if db_bootstrap_indexes is not None:
+            self.db_bootstrap_indexes = db_bootstrap_indexes
+        if db_max_pool_size:
+            self.db_max_pool_size = db_max_pool_size
+        if db_min_pool_size:
+            self.db_min_pool_size = db_min_pool_size
+        if db_server_selection_timeout_ms:
+            self.db_server_selection_timeout_ms = \
+                db_server_selection_timeout_ms
+        if db_connect_timeout_ms:
+            self.db_connect_timeout_ms = db_connect_timeout_ms
+        if db_socket_timeout_ms:
+            self.db_socket_timeout_ms = db_socket_timeout_ms
+        if db_compressors:
+            self.db_compressors = db_compressors
 
 
 class PyObjectId(ObjectId):
@@ -77,6 +202,10 @@ class User(BaseModel):
     name: str
     request_limit: Optional[int]=1000
     fine_tune_limit: Optional[int]=2
+    token_limit: Optional[int]=None
+    spend_limit: Optional[float]=None
+    weight: Optional[float]=None
+    max_concurrency: Optional[int]=None
     permissions: Optional[Dict]={
         "text_completion_models": True,
         "chat_completion_models": True,
@@ -97,6 +226,10 @@ class UserUpdate(BaseModel):
     name: Optional[str]=None
     request_limit: Optional[int]=None
     fine_tune_limit: Optional[int]=None
+    token_limit: Optional[int]=None
+    spend_limit: Optional[float]=None
+    weight: Optional[float]=None
+    max_concurrency: Optional[int]=None
     permissions: Optional[dict]=None
     @validator('permissions', pre=True)
     def permissions_check(cls, v):
@@ -150,6 +283,13 @@ class Embeddings(BaseModel):
     user: Optional[str]=None
 
 
+class Tokenize(BaseModel):
+    """Custom class for Tokenize data"""
+    model: str="gpt-3.5-turbo"
+    prompt: Optional[Union[str, list]]=None
+    messages: Optional[list]=None
+
+
 class FineTunes(BaseModel):
     """Custom class for Fine Tuning"""
     training_file: str
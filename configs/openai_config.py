@@ -7,11 +7,417 @@ class OpenAIConfig:
 
     Attributes:
         openai_api_key [required] (str): OpenAI API key.
+        openai_api_keys (list): Pool of upstream API keys for completion,
+            chat and embedding calls. An entry "key:model1|model2" restricts
+            the key to those models. Defaults to openai_api_key.
+        key_pool_strategy (str): "least_loaded" or "remaining_quota".
+        key_pool_cooldown (float): Seconds a key rests after a 429 without
+            a retry-after header.
+        model_snapshot_path (str): Path of the on-disk model catalog.
+        model_catalog_ttl (float): Seconds after which the model catalog is
+            refreshed.
+        embedding_cache (bool): Cache embeddings of string inputs.
+        embedding_cache_size (int): Max embeddings kept in memory.
+        embedding_cache_ttl (float): Seconds an embedding stays in memory.
+        embedding_cache_path (str): Path of the SQLite embedding cache, None
+            keeps embeddings in memory only.
+        embedding_cache_disk_size (int): Max embeddings kept on disk.
+        embedding_batch (bool): Coalesce concurrent small embedding requests
+            into one upstream call.
+        embedding_batch_window (float): Seconds to wait for more requests.
+        embedding_batch_max_inputs (int): Inputs that send a batch right away.
+        embedding_batch_max_request_inputs (int): Max inputs of a request to
+            be coalesced.
+        response_cache (bool): Cache responses of deterministic completion
+            requests.
+        response_cache_size (int): Max number of cached responses.
+        response_cache_ttl (float): Seconds a response stays cached.
+        single_flight (bool): Share one upstream call between identical
+            in-flight requests. Completion requests are shared only when
+            deterministic, i.e. temperature is 0.
+        passthrough (bool): Forward upstream completion, chat and embedding
+            response bodies to clients as received, instead of parsing and
+            serializing them again. Embedding responses are forwarded when
+            no input was found in the embedding cache, and still cached.
+            Responses merged with cached or batched embeddings are built by
+            the gateway.
+        tokenizer_warm_models (list): Models whose tokenizers are loaded at
+            startup.
+        tokenizer_threads (int): Threads counting large batches of tokens.
+        tokenizer_batch_threshold (int): Batch size counted on the thread
+            pool instead of the event loop.
+        metering_default_price (float): Dollars per 1K tokens charged for
+            models without a known price.
+        http_max_connections (int): Max open upstream connections.
+        http_max_connections_per_host (int): Max open connections to one
+            upstream host, 0 means no per-host limit.
+        http_keepalive_timeout (float): Seconds an idle connection is kept.
+        http_connect_timeout (float): Seconds to connect to the upstream.
+        http_read_timeout (float): Seconds an upstream request may take.
+        retry_max_retries (int): Retries of a failed upstream call.
+        retry_base_delay (float): Backoff of the first retry in seconds.
+        retry_max_delay (float): Max backoff between retries in seconds.
+        retry_max_retry_after (float): Longest retry-after header honoured,
+            longer ones fail the call right away.
+        breaker_failure_threshold (int): Consecutive upstream failures of a
+            model opening its circuit.
+        breaker_recovery_timeout (float): Seconds an open circuit fails
+            calls fast before trial calls.
+        breaker_half_open_calls (int): Trial calls of a recovering circuit.
+        scheduler_max_in_flight (int): Max upstream model calls running at
+            once over all workers, shared fairly between users. 0 disables
+            the scheduler.
+        scheduler_default_weight (float): Share of users without a weight.
+        scheduler_default_max_concurrency (int): Max calls at once of users
+            without a cap in each worker, None for no cap.
+        scheduler_max_wait (float): Max seconds a call waits for a slot.
+        scheduler_max_queue (int): Max calls waiting for a slot, None for
+            no limit.
+        admission (bool): Pace calls under the upstream requests and tokens
+            per minute limits instead of sending them into a 429. Each
+            worker paces its share of the limits.
+        admission_max_wait (float): Max seconds a call is held for the
+            limits, longer waits fail right away.
+        admission_default_rpm (int): Requests per minute of a key and model
+            until the upstream reports its limit, None to not pace until
+            then.
+        admission_default_tpm (int): Tokens per minute of a key and model
+            until the upstream reports its limit.
+        upload_buffer_size (int): Bytes of an uploaded file read at once
+            while it is validated and streamed upstream.
+        upload_validate_jsonl (bool): Reject uploaded files that are not
+            JSONL before sending them upstream.
+        listing_cache (bool): Cache file and fine-tune listings.
+        listing_cache_ttl (float): Seconds a listing is served without
+            asking openai.
+        listing_cache_stale_ttl (float): Seconds a listing is still served
+            after listing_cache_ttl while it is reloaded in the background.
+        fine_tune_tracker (bool): Track fine-tune jobs in the background so
+            clients can subscribe to their changes.
+        fine_tune_poll_min_interval (float): Seconds between polls of a
+            changing fine-tune job.
+        fine_tune_poll_max_interval (float): Max seconds between polls of a
+            fine-tune job.
+        fine_tune_poll_concurrency (int): Max fine-tune jobs polled at once.
+        fine_tune_sync_interval (float): Seconds between two reads of the
+            fine-tune jobs updated in the database, by each worker.
+        fine_tune_lease_ttl (float): Seconds the worker polling fine-tune
+            jobs holds its lease unless renewed. Another worker takes over
+            polling within this delay once it stops.
 
     """
     openai_api_key = str(os.getenv("OPENAI_API_KEY")) \
                      if os.getenv("OPENAI_API_KEY") else None
+    openai_api_keys = str(os.getenv("OPENAI_API_KEYS")).split(",") \
+                      if os.getenv("OPENAI_API_KEYS") else None
+    key_pool_strategy = str(os.getenv("OPENAI_KEY_POOL_STRATEGY")) \
+                        if os.getenv("OPENAI_KEY_POOL_STRATEGY") \
+                        else "least_loaded"
+    key_pool_cooldown = float(os.getenv("OPENAI_KEY_POOL_COOLDOWN")) \
+                        if os.getenv("OPENAI_KEY_POOL_COOLDOWN") else 10.0
+    model_snapshot_path = str(os.getenv("OPENAI_MODEL_SNAPSHOT_PATH")) \
+                          if os.getenv("OPENAI_MODEL_SNAPSHOT_PATH") \
+                          else "model_catalog.json"
+    model_catalog_ttl = float(os.getenv("OPENAI_MODEL_CATALOG_TTL")) \
+                        if os.getenv("OPENAI_MODEL_CATALOG_TTL") else 3600.0
+    embedding_cache = bool(os.getenv("OPENAI_EMBEDDING_CACHE") != 'false') \
+                      if os.getenv("OPENAI_EMBEDDING_CACHE") else True
+    embedding_cache_size = int(os.getenv("OPENAI_EMBEDDING_CACHE_SIZE")) \
+                           if os.getenv("OPENAI_EMBEDDING_CACHE_SIZE") \
+                           else 10000
+    embedding_cache_ttl = float(os.getenv("OPENAI_EMBEDDING_CACHE_TTL")) \
+                          if os.getenv("OPENAI_EMBEDDING_CACHE_TTL") \
+                          else 86400.0
+    embedding_cache_path = str(os.getenv("OPENAI_EMBEDDING_CACHE_PATH")) \
+                           if os.getenv("OPENAI_EMBEDDING_CACHE_PATH") \
+                           else None
+    embedding_cache_disk_size = \
+        int(os.getenv("OPENAI_EMBEDDING_CACHE_DISK_SIZE")) \
+        if os.getenv("OPENAI_EMBEDDING_CACHE_DISK_SIZE") else 1000000
+    embedding_batch = bool(os.getenv("OPENAI_EMBEDDING_BATCH") == 'true') \
+                      if os.getenv("OPENAI_EMBEDDING_BATCH") else False
+    embedding_batch_window = float(os.getenv("OPENAI_EMBEDDING_BATCH_WINDOW")) \
+                             if os.getenv("OPENAI_EMBEDDING_BATCH_WINDOW") \
+                             else 0.005
+    embedding_batch_max_inputs = \
+        int(os.getenv("OPENAI_EMBEDDING_BATCH_MAX_INPUTS")) \
+        if os.getenv("OPENAI_EMBEDDING_BATCH_MAX_INPUTS") else 256
+    embedding_batch_max_request_inputs = \
+        int(os.getenv("OPENAI_EMBEDDING_BATCH_MAX_REQUEST_INPUTS")) \
+        if os.getenv("OPENAI_EMBEDDING_BATCH_MAX_REQUEST_INPUTS") else 16
+    response_cache = bool(os.getenv("OPENAI_RESPONSE_CACHE") == 'true') \
+                     if os.getenv("OPENAI_RESPONSE_CACHE") else False
+    response_cache_size = int(os.getenv("OPENAI_RESPONSE_CACHE_SIZE")) \
+                          if os.getenv("OPENAI_RESPONSE_CACHE_SIZE") else 1000
+    response_cache_ttl = float(os.getenv("OPENAI_RESPONSE_CACHE_TTL")) \
+                         if os.getenv("OPENAI_RESPONSE_CACHE_TTL") else 3600.0
+    single_flight = bool(os.getenv("OPENAI_SINGLE_FLIGHT") != 'false') \
+                    if os.getenv("OPENAI_SINGLE_FLIGHT") else True
+    passthrough = bool(os.getenv("OPENAI_PASSTHROUGH") == 'true') \
+                  if os.getenv("OPENAI_PASSTHROUGH") else False
+    tokenizer_warm_models = \
+        str(os.getenv("OPENAI_TOKENIZER_WARM_MODELS")).split(",") \
+        if os.getenv("OPENAI_TOKENIZER_WARM_MODELS") \
+        else ["gpt-3.5-turbo", "text-davinci-003", "text-embedding-ada-002"]
+    tokenizer_threads = int(os.getenv("OPENAI_TOKENIZER_THREADS")) \
+                        if os.getenv("OPENAI_TOKENIZER_THREADS") else 4
+    tokenizer_batch_threshold = \
+        int(os.getenv("OPENAI_TOKENIZER_BATCH_THRESHOLD")) \
+        if os.getenv("OPENAI_TOKENIZER_BATCH_THRESHOLD") else 64
+    metering_default_price = \
+        float(os.getenv("OPENAI_METERING_DEFAULT_PRICE")) \
+        if os.getenv("OPENAI_METERING_DEFAULT_PRICE") else 0.12
+    http_max_connections = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS")) \
+                           if os.getenv("OPENAI_HTTP_MAX_CONNECTIONS") else 100
+    http_max_connections_per_host = \
+        int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS_PER_HOST")) \
+        if os.getenv("OPENAI_HTTP_MAX_CONNECTIONS_PER_HOST") else 0
+    http_keepalive_timeout = float(os.getenv("OPENAI_HTTP_KEEPALIVE_TIMEOUT")) \
+                             if os.getenv("OPENAI_HTTP_KEEPALIVE_TIMEOUT") \
+                             else 30.0
+    http_connect_timeout = float(os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT")) \
+                           if os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT") else 10.0
+    http_read_timeout = float(os.getenv("OPENAI_HTTP_READ_TIMEOUT")) \
+                        if os.getenv("OPENAI_HTTP_READ_TIMEOUT") else 600.0
+    retry_max_retries = int(os.getenv("OPENAI_RETRY_MAX_RETRIES")) \
+                        if os.getenv("OPENAI_RETRY_MAX_RETRIES") else 3
+    retry_base_delay = float(os.getenv("OPENAI_RETRY_BASE_DELAY")) \
+                       if os.getenv("OPENAI_RETRY_BASE_DELAY") else 0.5
+    retry_max_delay = float(os.getenv("OPENAI_RETRY_MAX_DELAY")) \
+                      if os.getenv("OPENAI_RETRY_MAX_DELAY") else 8.0
+    retry_max_retry_after = float(os.getenv("OPENAI_RETRY_MAX_RETRY_AFTER")) \
+                            if os.getenv("OPENAI_RETRY_MAX_RETRY_AFTER") \
+                            else 30.0
+    breaker_failure_threshold = \
+        int(os.getenv("OPENAI_BREAKER_FAILURE_THRESHOLD")) \
+        if os.getenv("OPENAI_BREAKER_FAILURE_THRESHOLD") else 5
+    breaker_recovery_timeout = \
+        float(os.getenv("OPENAI_BREAKER_RECOVERY_TIMEOUT")) \
+        if os.getenv("OPENAI_BREAKER_RECOVERY_TIMEOUT") else 30.0
+    breaker_half_open_calls = int(os.getenv("OPENAI_BREAKER_HALF_OPEN_CALLS")) \
+                              if os.getenv("OPENAI_BREAKER_HALF_OPEN_CALLS") \
+                              else 1
+    scheduler_max_in_flight = int(os.getenv("OPENAI_SCHEDULER_MAX_IN_FLIGHT")) \
+                              if os.getenv("OPENAI_SCHEDULER_MAX_IN_FLIGHT") \
+                              else 64
+    scheduler_default_weight = \
+        float(os.getenv("OPENAI_SCHEDULER_DEFAULT_WEIGHT")) \
+        if os.getenv("OPENAI_SCHEDULER_DEFAULT_WEIGHT") else 1.0
+    scheduler_default_max_concurrency = \
+        int(os.getenv("OPENAI_SCHEDULER_DEFAULT_MAX_CONCURRENCY")) \
+        if os.getenv("OPENAI_SCHEDULER_DEFAULT_MAX_CONCURRENCY") else None
+    scheduler_max_wait = float(os.getenv("OPENAI_SCHEDULER_MAX_WAIT")) \
+                         if os.getenv("OPENAI_SCHEDULER_MAX_WAIT") else 30.0
+    scheduler_max_queue = int(os.getenv("OPENAI_SCHEDULER_MAX_QUEUE")) \
+                          if os.getenv("OPENAI_SCHEDULER_MAX_QUEUE") else 1000
+    admission = bool(os.getenv("OPENAI_ADMISSION") != 'false') \
+                if os.getenv("OPENAI_ADMISSION") else True
+    admission_max_wait = float(os.getenv("OPENAI_ADMISSION_MAX_WAIT")) \
+                         if os.getenv("OPENAI_ADMISSION_MAX_WAIT") else 10.0
+    admission_default_rpm = int(os.getenv("OPENAI_ADMISSION_DEFAULT_RPM")) \
+                            if os.getenv("OPENAI_ADMISSION_DEFAULT_RPM") \
+                            else None
+    admission_default_tpm = int(os.getenv("OPENAI_ADMISSION_DEFAULT_TPM")) \
+                            if os.getenv("OPENAI_ADMISSION_DEFAULT_TPM") \
+                            else None
+    upload_buffer_size = int(os.getenv("OPENAI_UPLOAD_BUFFER_SIZE")) \
+                         if os.getenv("OPENAI_UPLOAD_BUFFER_SIZE") else 1048576
+    upload_validate_jsonl = \
+        bool(os.getenv("OPENAI_UPLOAD_VALIDATE_JSONL") != 'false') \
+        if os.getenv("OPENAI_UPLOAD_VALIDATE_JSONL") else True
+    listing_cache = bool(os.getenv("OPENAI_LISTING_CACHE") != 'false') \
+                    if os.getenv("OPENAI_LISTING_CACHE") else True
+    listing_cache_ttl = float(os.getenv("OPENAI_LISTING_CACHE_TTL")) \
+                        if os.getenv("OPENAI_LISTING_CACHE_TTL") else 10.0
+    listing_cache_stale_ttl = \
+        float(os.getenv("OPENAI_LISTING_CACHE_STALE_TTL")) \
+        if os.getenv("OPENAI_LISTING_CACHE_STALE_TTL") else 300.0
+    fine_tune_tracker = \
+        bool(os.getenv("OPENAI_FINE_TUNE_TRACKER") != 'false') \
+        if os.getenv("OPENAI_FINE_TUNE_TRACKER") else True
+    fine_tune_poll_min_interval = \
+        float(os.getenv("OPENAI_FINE_TUNE_POLL_MIN_INTERVAL")) \
+        if os.getenv("OPENAI_FINE_TUNE_POLL_MIN_INTERVAL") else 10.0
+    fine_tune_poll_max_interval = \
+        float(os.getenv("OPENAI_FINE_TUNE_POLL_MAX_INTERVAL")) \
+        if os.getenv("OPENAI_FINE_TUNE_POLL_MAX_INTERVAL") else 300.0
+    fine_tune_poll_concurrency = \
+        int(os.getenv("OPENAI_FINE_TUNE_POLL_CONCURRENCY")) \
+        if os.getenv("OPENAI_FINE_TUNE_POLL_CONCURRENCY") else 8
+    fine_tune_sync_interval = \
+        float(os.getenv("OPENAI_FINE_TUNE_SYNC_INTERVAL")) \
+        if os.getenv("OPENAI_FINE_TUNE_SYNC_INTERVAL") else 1.0
+    fine_tune_lease_ttl = \
+        float(os.getenv("OPENAI_FINE_TUNE_LEASE_TTL")) \
+        if os.getenv("OPENAI_FINE_TUNE_LEASE_TTL") else 30.0
 
-    def __init__(self, openai_api_key: str=None) -> None:
+    def __init__(self, openai_api_key: str=None,
+                 openai_api_keys: list=None,
+                 key_pool_strategy: str=None,
+                 key_pool_cooldown: float=None,
+                 model_snapshot_path: str=None,
+                 model_catalog_ttl: float=None,
+                 embedding_cache: bool=None,
+                 embedding_cache_size: int=None,
+                 embedding_cache_ttl: float=None,
+                 embedding_cache_path: str=None,
+                 embedding_cache_disk_size: int=None,
+                 embedding_batch: bool=None,
+                 embedding_batch_window: float=None,
+                 embedding_batch_max_inputs: int=None,
+                 embedding_batch_max_request_inputs: int=None,
+                 response_cache: bool=None,
+                 response_cache_size: int=None,
+                 response_cache_ttl: float=None,
+                 single_flight: bool=None,
+                 passthrough: bool=None,
+                 tokenizer_warm_models: list=None,
+                 tokenizer_threads: int=None,
+                 tokenizer_batch_threshold: int=None,
+                 metering_default_price: float=None,
+                 http_max_connections: int=None,
+                 http_max_connections_per_host: int=None,
+                 http_keepalive_timeout: float=None,
+                 http_connect_timeout: float=None,
+                 http_read_timeout: float=None,
+                 retry_max_retries: int=None,
+                 retry_base_delay: float=None,
+                 retry_max_delay: float=None,
+                 retry_max_retry_after: float=None,
+                 breaker_failure_threshold: int=None,
+                 breaker_recovery_timeout: float=None,
+                 breaker_half_open_calls: int=None,
+                 scheduler_max_in_flight: int=None,
+                 scheduler_default_weight: float=None,
+                 scheduler_default_max_concurrency: int=None,
+                 scheduler_max_wait: float=None,
+                 scheduler_max_queue: int=None,
+                 admission: bool=None,
+                 admission_max_wait: float=None,
+                 admission_default_rpm: int=None,
+                 admission_default_tpm: int=None,
+                 upload_buffer_size: int=None,
+                 upload_validate_jsonl: bool=None,
+                 listing_cache: bool=None,
+                 listing_cache_ttl: float=None,
+                 listing_cache_stale_ttl: float=None,
+                 fine_tune_tracker: bool=None,
+                 fine_tune_poll_min_interval: float=None,
+                 fine_tune_poll_max_interval: float=None,
+                 fine_tune_poll_concurrency: int=None,
+                 fine_tune_sync_interval: float=None,
+                 fine_tune_lease_ttl: float=None) -> None:
         if openai_api_key:
             self.openai_api_key = openai_api_key
+        if openai_api_keys:
+            self.openai_api_keys = openai_api_keys
+        if key_pool_strategy:
+            self.key_pool_strategy = key_pool_strategy
+        if key_pool_cooldown:
+            self.key_pool_cooldown = key_pool_cooldown
+        if model_snapshot_path:
+            self.model_snapshot_path = model_snapshot_path
+        if model_catalog_ttl:
+            self.model_catalog_ttl = model_catalog_ttl
+        if embedding_cache is not None:
+            self.embedding_cache = embedding_cache
+        if embedding_cache_size:
+            self.embedding_cache_size = embedding_cache_size
+        if embedding_cache_ttl:
+            self.embedding_cache_ttl = embedding_cache_ttl
+        if embedding_cache_path:
+            self.embedding_cache_path = embedding_cache_path
+        if embedding_cache_disk_size:
+            self.embedding_cache_disk_size = embedding_cache_disk_size
+        if embedding_batch is not None:
+            self.embedding_batch = embedding_batch
+        if embedding_batch_window:
+            self.embedding_batch_window = embedding_batch_window
+        if embedding_batch_max_inputs:
+            self.embedding_batch_max_inputs = embedding_batch_max_inputs
+        if embedding_batch_max_request_inputs:
+            self.embedding_batch_max_request_inputs = \
+                embedding_batch_max_request_inputs
+        if response_cache is not None:
+            self.response_cache = response_cache
+        if response_cache_size:
+            self.response_cache_size = response_cache_size
+        if response_cache_ttl:
+            self.response_cache_ttl = response_cache_ttl
+        if single_flight is not None:
+            self.single_flight = single_flight
+        if passthrough is not None:
+            self.passthrough = passthrough
+        if tokenizer_warm_models:
+            self.tokenizer_warm_models = tokenizer_warm_models
+        if tokenizer_threads:
+            self.tokenizer_threads = tokenizer_threads
+        if tokenizer_batch_threshold:
+            self.tokenizer_batch_threshold = tokenizer_batch_threshold
+        if metering_default_price is not None:
+            self.metering_default_price = metering_default_price
+        if http_max_connections:
+            self.http_max_connections = http_max_connections
+        if http_max_connections_per_host:
+            self.http_max_connections_per_host = http_max_connections_per_host
+        if http_keepalive_timeout:
+            self.http_keepalive_timeout = http_keepalive_timeout
+        if http_connect_timeout:
+            self.http_connect_timeout = http_connect_timeout
+        if http_read_timeout:
+            self.http_read_timeout = http_read_timeout
+        if retry_max_retries is not None:
+            self.retry_max_retries = retry_max_retries
+        if retry_base_delay:
+            self.retry_base_delay = retry_base_delay
+        if retry_max_delay:
+            self.retry_max_delay = retry_max_delay
+        if retry_max_retry_after is not None:
+            self.retry_max_retry_after = retry_max_retry_after
+        if breaker_failure_threshold:
+            self.breaker_failure_threshold = breaker_failure_threshold
+        if breaker_recovery_timeout:
+            self.breaker_recovery_timeout = breaker_recovery_timeout
+        if breaker_half_open_calls:
+            self.breaker_half_open_calls = breaker_half_open_calls
+        if scheduler_max_in_flight is not None:
+            self.scheduler_max_in_flight = scheduler_max_in_flight
+        if scheduler_default_weight:
+            self.scheduler_default_weight = scheduler_default_weight
+        if scheduler_default_max_concurrency:
+            self.scheduler_default_max_concurrency = \
+                scheduler_default_max_concurrency
+        if scheduler_max_wait:
+            self.scheduler_max_wait = scheduler_max_wait
+        if scheduler_max_queue:
+            self.scheduler_max_queue = scheduler_max_queue
+        if admission is not None:
+            self.admission = admission
+        if admission_max_wait:
+            self.admission_max_wait = admission_max_wait
+        if admission_default_rpm:
+            self.admission_default_rpm = admission_default_rpm
+        if admission_default_tpm:
+            self.admission_default_tpm = admission_default_tpm
+        if upload_buffer_size:
+            self.upload_buffer_size = upload_buffer_size
+        if upload_validate_jsonl is not None:
+            self.upload_validate_jsonl = upload_validate_jsonl
+        if listing_cache is not None:
+            self.listing_cache = listing_cache
+        if listing_cache_ttl:
+            self.listing_cache_ttl = listing_cache_ttl
+        if listing_cache_stale_ttl is not None:
+            self.listing_cache_stale_ttl = listing_cache_stale_ttl
+        if fine_tune_tracker is not None:
+            self.fine_tune_tracker = fine_tune_tracker
+        if fine_tune_poll_min_interval:
+            self.fine_tune_poll_min_interval = fine_tune_poll_min_interval
+        if fine_tune_poll_max_interval:
+            self.fine_tune_poll_max_interval = fine_tune_poll_max_interval
+        if fine_tune_poll_concurrency:
+            self.fine_tune_poll_concurrency = fine_tune_poll_concurrency
+        if fine_tune_sync_interval:
+            self.fine_tune_sync_interval = fine_tune_sync_interval
+        if fine_tune_lease_ttl:
+            self.fine_tune_lease_ttl = fine_tune_lease_ttl
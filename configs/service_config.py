@@ -6,6 +6,20 @@ class ServiceConfig:
     """Necessary configs for Service.
 
     Attributes:
+        host (str): Address the gateway binds to.
+        port (int): Port the gateway binds to.
+        url_swagger (str): Path of the Swagger docs, None to disable them.
+        url_redoc (str): Path of the ReDoc docs, None to disable them.
+        workers (int): Worker processes serving requests.
+        loop (str): Event loop of the workers, "auto" uses uvloop when it
+            is installed.
+        http (str): HTTP protocol of the workers, "auto" uses httptools
+            when it is installed.
+        preload (bool): Import the app once before forking the workers.
+        graceful_timeout (int): Seconds a worker drains its requests on
+            shutdown or reload before it is killed.
+        keepalive_timeout (int): Seconds an idle keep-alive connection is
+            kept open.
 
     """
     host = str(os.getenv("HOST")) \
@@ -16,11 +30,29 @@ class ServiceConfig:
                   if os.getenv("URL_SWAGGER") else None
     url_redoc = str(os.getenv("URL_REDOC")) \
                 if os.getenv("URL_REDOC") else None
+    workers = int(os.getenv("WORKERS")) \
+              if os.getenv("WORKERS") else 1
+    loop = str(os.getenv("LOOP")) \
+           if os.getenv("LOOP") else "auto"
+    http = str(os.getenv("HTTP")) \
+           if os.getenv("HTTP") else "auto"
+    preload = bool(os.getenv("PRELOAD") != 'false') \
+              if os.getenv("PRELOAD") else True
+    graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT")) \
+                       if os.getenv("GRACEFUL_TIMEOUT") else 30
+    keepalive_timeout = int(os.getenv("KEEPALIVE_TIMEOUT")) \
+                        if os.getenv("KEEPALIVE_TIMEOUT") else 5
 
 
     def __init__(self, host: str=None, port: int=None,
                  url_swagger: str=None,
-                 url_redoc: str=None) -> None:
+                 url_redoc: str=None,
+                 workers: int=None,
+                 loop: str=None,
+                 http: str=None,
+                 preload: bool=None,
+                 graceful_timeout: int=None,
+                 keepalive_timeout: int=None) -> None:
         if host:
             self.host = host
         if port:
@@ -29,3 +61,15 @@ class ServiceConfig:
             self.url_swagger = url_swagger
         if url_redoc:
             self.url_redoc = url_redoc
+        if workers:
+            self.workers = workers
+        if loop:
+            self.loop = loop
+        if http:
+            self.http = http
+        if preload is not None:
+            self.preload = preload
+        if graceful_timeout is not None:
+            self.graceful_timeout = graceful_timeout
+        if keepalive_timeout is not None:
+            self.keepalive_timeout = keepalive_timeout
@@ -1,14 +1,17 @@
 """This module handles operations of database"""
 import datetime
-import nest_asyncio
-nest_asyncio.apply()
-import asyncio
 
 import motor.motor_asyncio
-from pymongo.errors import CollectionInvalid
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+from pymongo.write_concern import WriteConcern
 
 from logger.ve_logger import VeLogger
 from configs.database_config import DatabaseConfig, User
+from database_services.ts_writer import TimeSeriesWriter
+from database_services.quota_engine import QuotaEngine, BUDGET_KEYS
+from database_services.user_invalidations import UserInvalidations
+from database_services.indexes import bootstrap_indexes
 from utils.database_utils import generate_api_key, hash_api_key
 
 
@@ -18,11 +21,14 @@ class DatabaseService:
     # Initialize logger
     logger = VeLogger()
 
-    def __init__(self, database_config: DatabaseConfig=None) -> None:
+    def __init__(self, database_config: DatabaseConfig=None,
+                 workers: int=1) -> None:
         """Initializer of database.
         
         Args:
             database_config (DatabaseConfig): Config of database.
+            workers (int): Worker processes sharing the database, whose
+                quota engines share the overspend tolerance.
 
         Returns:
             None
@@ -41,12 +47,27 @@ class DatabaseService:
                 "Provide Database URL when initializing class. You can set the " \
                 "enviroment variable `DB_URL` to your URL endpoint.")
 
+        # The client does not connect before its first operation, so that
+        # workers forked from a preloaded app each open their own pool
+        client_options = {
+            "connect": False,
+            "maxPoolSize": database_config.db_max_pool_size,
+            "minPoolSize": database_config.db_min_pool_size,
+            "serverSelectionTimeoutMS": \
+                database_config.db_server_selection_timeout_ms,
+            "connectTimeoutMS": database_config.db_connect_timeout_ms,
+            "socketTimeoutMS": database_config.db_socket_timeout_ms,
+        }
+        if database_config.db_compressors:
+            client_options["compressors"] = database_config.db_compressors
         self.client = motor.motor_asyncio.AsyncIOMotorClient(
-            database_config.db_url)
+            database_config.db_url, **client_options)
         self.db_name = database_config.db_name
         self.db_user_collection = database_config.db_user_collection
         self.db_admin_collection = database_config.db_admin_collection
         self.db_ts_collection = database_config.db_ts_collection
+        self.db_fine_tune_collection = database_config.db_fine_tune_collection
+        self.db_lease_collection = database_config.db_lease_collection
         self.db = self.client[self.db_name]
         self.user_collection = self.db.get_collection(
             self.db_user_collection
@@ -54,10 +75,101 @@ class DatabaseService:
         self.admin_collection = self.db.get_collection(
             self.db_admin_collection
         )
-        asyncio.run(self._create_ts_collection(self.db_ts_collection))
         self.ts_collection = self.db.get_collection(
             self.db_ts_collection
         )
+        self.fine_tune_collection = self.db.get_collection(
+            self.db_fine_tune_collection
+        )
+        self.lease_collection = self.db.get_collection(
+            self.db_lease_collection
+        )
+        self.invalidation_collection = self.db.get_collection(
+            database_config.db_invalidation_collection
+        )
+        ts_write_concern = database_config.db_ts_write_concern
+        if ts_write_concern.isdigit():
+            ts_write_concern = int(ts_write_concern)
+        self.ts_writer = TimeSeriesWriter(
+            collection=self.ts_collection.with_options(
+                write_concern=WriteConcern(w=ts_write_concern)),
+            batch_size=database_config.db_ts_batch_size,
+            flush_interval=database_config.db_ts_flush_interval,
+            max_queue_size=database_config.db_ts_queue_size)
+        self.bootstrap_indexes = database_config.db_bootstrap_indexes
+        self.quota_engine = None
+        if database_config.db_quota_write_behind:
+            if database_config.db_quota_overspend_tolerance < workers:
+                self.logger.error("Quota overspend tolerance below workers.")
+                raise ValueError(
+                    "Set `DB_QUOTA_OVERSPEND_TOLERANCE` to at least the " \
+                    f"{workers} workers, each flushes at its share.")
+            self.quota_engine = QuotaEngine(
+                collection=self.user_collection,
+                flush_interval=database_config.db_quota_flush_interval,
+                # Each worker gets its share, the sum stays within tolerance
+                overspend_tolerance=\
+                    database_config.db_quota_overspend_tolerance // workers)
+        self.user_invalidations = UserInvalidations(
+            collection=self.invalidation_collection,
+            interval=database_config.db_invalidation_interval)
+        self.user_invalidations.add_listener(self._invalidate_quota)
+
+    async def setup(self):
+        """Create the time-series collection and missing indexes
+
+        Returns:
+            list: report of the index bootstrap, None if it is disabled.
+
+        """
+        await self._create_ts_collection(self.db_ts_collection)
+        if self.bootstrap_indexes:
+            return await self.create_indexes()
+        return None
+
+    async def start(self):
+        """Set up the database and start background tasks.
+
+        Should be awaited from the lifespan of the app, so that all network
+        I/O happens on the serving event loop.
+        """
+        await self.setup()
+        self.ts_writer.start()
+        if self.quota_engine is not None:
+            await self.quota_engine.start()
+        self.user_invalidations.start()
+
+    async def close(self):
+        """Drain background tasks of the database service."""
+        await self.user_invalidations.stop()
+        if self.quota_engine is not None:
+            await self.quota_engine.stop()
+        await self.ts_writer.stop()
+        self.client.close()
+
+    async def create_indexes(self):
+        """Create missing indexes of all collections
+
+        Returns:
+            list: report of created, existing and failed indexes.
+
+        """
+        report = await bootstrap_indexes(self)
+        created = [item["index"] for item in report
+                   if item["status"] == "created"]
+        if created:
+            self.logger.info(f"Created indexes: {created}")
+        return report
+
+    @property
+    def _quota_write_behind(self):
+        """Whether limits are handled by the write-behind quota engine."""
+        return self.quota_engine is not None and self.quota_engine.running
+
+    async def _invalidate_quota(self, user_id: str, discard: bool=False):
+        """Drop counters of a user held by the quota engine, if any."""
+        if self._quota_write_behind:
+            await self.quota_engine.invalidate_user(user_id, discard=discard)
 
     async def _create_ts_collection(self, collection_name):
         """Create a time-series collection."""
@@ -126,17 +238,17 @@ class DatabaseService:
 
     async def update_limit(self, hashed_api_key: str, limit_key: str,
                            cost: int):
-        """Update request limit"""
-        doc = await self._get_doc(self.user_collection,
-                                  {"api_key": hashed_api_key})
-        request_limit = int(doc[limit_key])
-        result = await self._update_doc(
-            self.user_collection,
+        """Update request limit in one atomic operation.
+
+        A negative cost gives quota back to the user.
+        """
+        if self._quota_write_behind:
+            return await self.quota_engine.update(hashed_api_key, limit_key,
+                                                  cost)
+        result = await self.user_collection.update_one(
             {"api_key": hashed_api_key},
-            {limit_key: request_limit - cost}
-        )
-        return {"message": "Limit has been updated. "\
-                          f"Limit: {doc[limit_key]}",
+            {"$inc": {limit_key: -cost}})
+        return {"message": "Limit has been updated.",
                 "acknowledged": result.acknowledged,
                 "status_code": 200}
 
@@ -152,9 +264,119 @@ class DatabaseService:
                                        limit_key="fine_tune_limit",
                                        cost=cost)
 
+    async def reserve_limit(self, hashed_api_key: str, limit_key: str,
+                            cost: int):
+        """Check and decrement limit in a single round trip.
+
+        The decrement only applies when the remaining limit covers the cost,
+        so concurrent requests of one key can not overspend it.
+
+        Args:
+            hashed_api_key (str): Hashed API key of the user.
+            limit_key (str): Name of the limit field in the user document.
+            cost (int): Amount to reserve.
+
+        Returns:
+            dict: acknowledged is False when the limit has been surpassed.
+
+        """
+        if self._quota_write_behind:
+            return await self.quota_engine.reserve(hashed_api_key, limit_key,
+                                                   cost)
+        doc_filter = {"api_key": hashed_api_key, limit_key: {"$gte": cost}}
+        if limit_key == "request_limit":
+            # Token and spend budgets are unlimited when not set
+            doc_filter["$and"] = [
+                {"$or": [{budget_key: None}, {budget_key: {"$gt": 0}}]}
+                for budget_key in BUDGET_KEYS]
+        doc = await self.user_collection.find_one_and_update(
+            doc_filter,
+            {"$inc": {limit_key: -cost}},
+            projection={limit_key: 1, "_id": 0},
+            return_document=ReturnDocument.AFTER)
+        if doc is None:
+            return {"message": "Limit has been surpassed. "\
+                               "Contact adminstration.",
+                    "acknowledged": False,
+                    "status_code": 429}
+        return {"message": f"Limit is {doc[limit_key]}",
+                "acknowledged": True,
+                "status_code": 200}
+
+    async def charge_usage(self, hashed_api_key: str, usage: dict,
+                           user: dict=None):
+        """Decrement token and spend budgets by the usage of a request
+
+        Budgets that are not set on the user are left untouched.
+
+        Args:
+            hashed_api_key (str): Hashed API key of the user.
+            usage (dict): total_tokens and spend of the request.
+            user (dict): Verified user document, whose unset budgets are
+                not written at all.
+
+        Returns:
+            dict: result of the update.
+
+        """
+        amounts = {"token_limit": usage.get("total_tokens", 0),
+                   "spend_limit": usage.get("spend", 0.0)} if usage else {}
+        if user is not None:
+            amounts = {budget_key: amount
+                       for budget_key, amount in amounts.items()
+                       if isinstance(user.get(budget_key), (int, float))}
+        amounts = {budget_key: amount for budget_key, amount
+                   in amounts.items() if amount}
+        if not amounts:
+            return {"message": "No usage to charge.",
+                    "acknowledged": True,
+                    "status_code": 200}
+
+        if self._quota_write_behind:
+            return await self.quota_engine.charge(hashed_api_key, amounts)
+
+        result = await self.user_collection.bulk_write([
+            UpdateOne({"api_key": hashed_api_key,
+                       budget_key: {"$type": "number"}},
+                      {"$inc": {budget_key: -amount}})
+            for budget_key, amount in amounts.items()], ordered=False)
+        return {"message": "Usage has been charged.",
+                "acknowledged": result.acknowledged,
+                "status_code": 200}
+
+    async def flush_quota(self, hashed_api_key: str):
+        """Write spend of a key not flushed yet by the quota engine"""
+        if self._quota_write_behind:
+            await self.quota_engine.flush([hashed_api_key])
+
+    async def reserve_request_limit(self, hashed_api_key: str, cost: int=1):
+        """Reserve request limit"""
+        return await self.reserve_limit(hashed_api_key=hashed_api_key,
+                                        limit_key="request_limit",
+                                        cost=cost)
+
+    async def reserve_finetune_limit(self, hashed_api_key: str, cost: int=1):
+        """Reserve fine-tune limit"""
+        return await self.reserve_limit(hashed_api_key=hashed_api_key,
+                                        limit_key="fine_tune_limit",
+                                        cost=cost)
+
+    async def refund_request_limit(self, hashed_api_key: str, cost: int=1):
+        """Give back a reserved request limit"""
+        return await self.update_request_limit(hashed_api_key=hashed_api_key,
+                                               cost=-cost)
+
+    async def refund_finetune_limit(self, hashed_api_key: str, cost: int=1):
+        """Give back a reserved fine-tune limit"""
+        return await self.update_finetune_limit(hashed_api_key=hashed_api_key,
+                                                cost=-cost)
+
     async def verify_api_key(self, token: str):
         """Verify API key."""
-        hashed_token = hash_api_key(token)
+        return await self.verify_hashed_api_key(hash_api_key(token))
+
+    async def verify_hashed_api_key(self, hashed_token: str):
+        """Verify already hashed API key."""
         doc = await self._get_doc(self.user_collection,
                                   {'api_key': hashed_token})
         if bool(doc):
@@ -223,10 +445,14 @@ class DatabaseService:
             None
 
         """
+        await self._invalidate_quota(user.user_id)
         # Check arguments
         check_exists = await self._update_doc(self.user_collection,
                                               {'user_id': user.user_id},
                                               user.dict(exclude_unset=True))
+        # Drop limits loaded while the user was edited, in all workers
+        await self._invalidate_quota(user.user_id)
+        await self.user_invalidations.publish(user.user_id)
         if check_exists.matched_count == 0 and check_exists.modified_count == 0:
             return {"message": "User does not exists.",
                     "acknowledged": False,
@@ -298,20 +524,35 @@ class DatabaseService:
                     "acknowledged": False,
                     "status_code": 409}
 
+        await self._invalidate_quota(check_exists['user_id'], discard=True)
+        await self.user_invalidations.publish(check_exists['user_id'],
+                                              discard=True)
+
         return {"message": "User deleted successfully.",
                 "data": check_exists,
                 "acknowledged": True,
                 "status_code": 200}
 
+    def _time_series_doc(self, user_id: str, endpoint: str, cost: int,
+                         usage: dict=None):
+        """Build a time-series document"""
+        doc = {
+            "metadata": { "user_id": user_id, "endpoint": endpoint },
+            "timestamp": datetime.datetime.now(),
+            "request": cost
+        }
+        if usage:
+            doc["prompt_tokens"] = usage.get("prompt_tokens", 0)
+            doc["completion_tokens"] = usage.get("completion_tokens", 0)
+            doc["tokens"] = usage.get("total_tokens", 0)
+            doc["spend"] = usage.get("spend", 0.0)
+        return doc
+
     async def _add_time_series(self, collection, user_id: str, endpoint: str,
-                               cost: int):
+                               cost: int, usage: dict=None):
         """Insert time-series"""
-        result = await collection.insert_one({
-                "metadata": { "user_id": user_id, "endpoint": endpoint },
-                "timestamp": datetime.datetime.now(),
-                "request": cost
-            }
-        )
+        result = await collection.insert_one(
+            self._time_series_doc(user_id, endpoint, cost, usage))
         return {"message": "Record has been added.",
                 "acknowledged": result.acknowledged,
                 "status_code": 200}
@@ -331,12 +572,24 @@ class DatabaseService:
                                               user_id=user_id)
 
     async def add_request_ts_record(self, user_id: str, endpoint: str,
-                                    cost: int=1):
-        """Add time series record"""
+                                    cost: int=1, usage: dict=None):
+        """Add time series record
+
+        When the background writer is running the record is queued and
+        written in a batch, otherwise it is inserted directly.
+        """
+        if self.ts_writer.running:
+            queued = self.ts_writer.put(
+                self._time_series_doc(user_id, endpoint, cost, usage))
+            return {"message": "Record has been queued." if queued else \
+                               "Record has been dropped.",
+                    "acknowledged": queued,
+                    "status_code": 200}
         return await self._add_time_series(collection=self.ts_collection,
                                            user_id=user_id,
                                            endpoint=endpoint,
-                                           cost=cost)
+                                           cost=cost,
+                                           usage=usage)
 
     async def get_ts_dates(self, user_id: str, endpoint: str, day_from: float,
                            day_to: float=None, slice: str="hour"):
@@ -376,7 +629,9 @@ class DatabaseService:
                     "date": {
                         "$dateToParts": { "date": "$timestamp" }
                     },
-                    "request": "$request"
+                    "request": "$request",
+                    "tokens": "$tokens",
+                    "spend": "$spend"
                 }
             },
             {
@@ -384,7 +639,9 @@ class DatabaseService:
                     "_id": {
                         "date": date_limiter[slice]
                     },
-                    "sum_request": { "$sum": "$request" }
+                    "sum_request": { "$sum": "$request" },
+                    "sum_tokens": { "$sum": "$tokens" },
+                    "sum_spend": { "$sum": "$spend" }
                 }
             }
         ]
@@ -392,6 +649,150 @@ class DatabaseService:
         dataset = self.ts_collection.aggregate(pipeline)
         return await dataset.to_list(length=None)
 
+    async def create_fine_tune(self, fine_tune: dict, user_id: str=None):
+        """Save a fine-tune job just created, at revision 0
+
+        A job already saved is left as it is, so a poll that got there
+        first is not overwritten.
+
+        Args:
+            fine_tune (dict): Fine-tune job as returned by openai.
+            user_id (str): ID of the user who created the job.
+
+        Returns:
+            dict: result of saving the job.
+
+        """
+        now = datetime.datetime.now()
+        result = await self.fine_tune_collection.update_one(
+            {"id": fine_tune["id"]},
+            {"$setOnInsert": {"status": fine_tune.get("status"),
+                              "revision": 0,
+                              "fine_tune": fine_tune,
+                              "user_id": user_id,
+                              "created_at": now,
+                              "updated_at": now,
+                              "poll_requested_at": now}},
+            upsert=True)
+        return {"message": "Fine-tune has been saved.",
+                "acknowledged": result.acknowledged,
+                "status_code": 200}
+
+    async def save_fine_tune(self, fine_tune: dict, user_id: str=None):
+        """Save a new state of a tracked fine-tune job
+
+        The revision of the job is incremented in the database, so it only
+        grows whichever process saves the job.
+
+        Args:
+            fine_tune (dict): Fine-tune job as returned by openai, with its
+                events.
+            user_id (str): ID of the user who created the job, kept if the
+                job is saved for the first time.
+
+        Returns:
+            dict: result with the new revision of the job in `data`.
+
+        """
+        now = datetime.datetime.now()
+        doc = await self.fine_tune_collection.find_one_and_update(
+            {"id": fine_tune["id"]},
+            {"$set": {"status": fine_tune.get("status"),
+                      "fine_tune": fine_tune,
+                      "updated_at": now},
+             "$inc": {"revision": 1},
+             "$setOnInsert": {"user_id": user_id, "created_at": now}},
+            projection={"_id": 0, "revision": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+        return {"message": "Fine-tune has been saved.",
+                "data": {"revision": doc["revision"]},
+                "acknowledged": True,
+                "status_code": 200}
+
+    async def request_fine_tune_poll(self, fine_tune_id: str):
+        """Ask the tracker to poll a fine-tune job soon
+
+        Args:
+            fine_tune_id (str): id of the fine-tuning process.
+
+        Returns:
+            dict: result of the request.
+
+        """
+        now = datetime.datetime.now()
+        result = await self.fine_tune_collection.update_one(
+            {"id": fine_tune_id},
+            {"$set": {"poll_requested_at": now, "updated_at": now}})
+        return {"message": "Fine-tune poll has been requested.",
+                "acknowledged": result.acknowledged,
+                "status_code": 200}
+
+    async def retrieve_fine_tune(self, fine_tune_id: str):
+        """Get a saved fine-tune job
+
+        Args:
+            fine_tune_id (str): id of the fine-tuning process.
+
+        Returns:
+            dict: result with the saved job in `data`.
+
+        """
+        doc = await self.fine_tune_collection.find_one(
+            {"id": fine_tune_id}, projection={"_id": 0})
+        if doc is None:
+            return {"message": "Fine-tune is not tracked.",
+                    "acknowledged": False,
+                    "status_code": 404}
+        return {"message": "Fine-tune found.",
+                "data": doc,
+                "acknowledged": True,
+                "status_code": 200}
+
+    async def find_active_fine_tunes(self):
+        """Find saved fine-tune jobs that are not finished yet"""
+        dataset = self.fine_tune_collection.find(
+            {"status": {"$nin": ["succeeded", "failed", "cancelled"]}},
+            projection={"_id": 0})
+        return await dataset.to_list(length=None)
+
+    async def find_updated_fine_tunes(self, since: datetime.datetime):
+        """Find saved fine-tune jobs updated at or after since"""
+        dataset = self.fine_tune_collection.find(
+            {"updated_at": {"$gte": since}}, projection={"_id": 0})
+        return await dataset.to_list(length=None)
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float):
+        """Take or renew a lease, held by one owner at a time
+
+        Args:
+            name (str): Name of the lease.
+            owner (str): Unique ID of the process asking for the lease.
+            ttl (float): Seconds the lease is held unless renewed.
+
+        Returns:
+            bool: Whether owner holds the lease.
+
+        """
+        now = datetime.datetime.now()
+        try:
+            doc = await self.lease_collection.find_one_and_update(
+                {"_id": name,
+                 "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner,
+                          "expires_at": now + datetime.timedelta(
+                              seconds=ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # Held by another owner, the upsert collided with its lease
+            return False
+        return doc is not None and doc["owner"] == owner
+
+    async def release_lease(self, name: str, owner: str):
+        """Give up a lease held by owner"""
+        await self.lease_collection.delete_one({"_id": name, "owner": owner})
+
     async def find_all_property(self, collection, key: str):
         """Find all properties in a collection"""
         dataset = collection.find({}, {key:1})
@@ -0,0 +1,131 @@
+"""This module bootstraps the indexes of all collections.
+
+It runs at startup of the service and can be run on its own via:
+
+    python3 -m database_services.indexes
+
+"""
+import asyncio
+import json
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from logger.ve_logger import VeLogger
+
+
+logger = VeLogger()
+
+# Indexes of each collection, keyed by attribute name of DatabaseService
+INDEXES = {
+    "user_collection": [
+        {"keys": [("api_key", ASCENDING)], "name": "api_key_unique",
+         "unique": True},
+        {"keys": [("user_id", ASCENDING)], "name": "user_id_unique",
+         "unique": True},
+    ],
+    "admin_collection": [
+        {"keys": [("username", ASCENDING)], "name": "username_unique",
+         "unique": True},
+    ],
+    "ts_collection": [
+        {"keys": [("metadata.user_id", ASCENDING),
+                  ("metadata.endpoint", ASCENDING),
+                  ("timestamp", ASCENDING)],
+         "name": "user_endpoint_timestamp"},
+    ],
+    "fine_tune_collection": [
+        {"keys": [("id", ASCENDING)], "name": "fine_tune_id_unique",
+         "unique": True},
+        {"keys": [("status", ASCENDING)], "name": "status"},
+        {"keys": [("updated_at", ASCENDING)], "name": "updated_at"},
+    ],
+    "invalidation_collection": [
+        {"keys": [("created_at", ASCENDING)], "name": "created_at_ttl",
+         "expire_after_seconds": 3600},
+    ],
+}
+
+
+def _same_index(index: dict, info: dict):
+    """Whether an existing index has the keys and options of index."""
+    return [tuple(key) for key in info["key"]] == list(index["keys"]) and \
+        bool(info.get("unique", False)) == index.get("unique", False) and \
+        info.get("expireAfterSeconds") == index.get("expire_after_seconds")
+
+
+async def bootstrap_indexes(database_service):
+    """Create missing indexes of all collections
+
+    Indexes are compared by keys and options, so an existing index under
+    another name counts as existing. An existing index with the same keys
+    or name but other options is reported as a conflict and left untouched,
+    so this is safe to run repeatedly.
+
+    Args:
+        database_service (DatabaseService): Service owning the collections.
+
+    Returns:
+        list: report with collection, index name and status of each index.
+
+    """
+    report = []
+    for attribute, indexes in INDEXES.items():
+        collection = getattr(database_service, attribute)
+        existing = await collection.index_information()
+        for index in indexes:
+            item = {"collection": collection.name, "index": index["name"]}
+            same = [name for name, info in existing.items()
+                    if _same_index(index, info)]
+            if same:
+                item["status"] = "exists"
+                if index["name"] not in same:
+                    item["existing"] = same[0]
+                report.append(item)
+                continue
+            conflicts = [name for name, info in existing.items()
+                         if name == index["name"] or
+                         [tuple(key) for key in info["key"]] == \
+                         list(index["keys"])]
+            if conflicts:
+                item["status"] = "conflict"
+                item["existing"] = conflicts[0]
+                logger.warning(f"Index {conflicts[0]} on {collection.name} " \
+                               f"differs from {index['name']}, not changed.")
+                report.append(item)
+                continue
+            try:
+                options = {"unique": index.get("unique", False)}
+                if "expire_after_seconds" in index:
+                    options["expireAfterSeconds"] = \
+                        index["expire_after_seconds"]
+                await collection.create_index(
+                    index["keys"], name=index["name"], **options)
+                item["status"] = "created"
+                logger.info(f"Created index {index['name']} on " \
+                            f"{collection.name}.")
+            except OperationFailure as exception:
+                item["status"] = "failed"
+                item["message"] = str(exception)
+                logger.error(f"Creating index {index['name']} on " \
+                             f"{collection.name} failed with {exception}")
+            report.append(item)
+    return report
+
+
+async def main():
+    """Run index bootstrap and print the report."""
+    from configs.database_config import DatabaseConfig
+    from database_services.database_service import DatabaseService
+
+    database = DatabaseService(database_config=DatabaseConfig())
+    database.bootstrap_indexes = True
+    try:
+        report = await database.setup()
+    finally:
+        database.client.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
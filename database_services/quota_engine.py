@@ -0,0 +1,338 @@
+"""This module keeps write-behind quota counters in memory."""
+import asyncio
+
+from pymongo import UpdateOne
+
+from logger.ve_logger import VeLogger
+
+
+LIMIT_KEYS = ["request_limit", "fine_tune_limit"]
+BUDGET_KEYS = ["token_limit", "spend_limit"]
+
+
+class QuotaEngine:
+    """Enforce user limits in memory and flush spent quota to Mongo.
+
+    The remaining limit of a key is loaded once from the users collection and
+    enforced locally. Spent quota is accumulated per key and written with one
+    bulk `$inc` per flush interval. A key is flushed right away once its
+    unflushed spend reaches overspend_tolerance, which bounds how much several
+    workers sharing one key can overspend it.
+
+    Attributes:
+        collection (AsyncIOMotorCollection): Users collection.
+        flush_interval (float): Seconds between two flushes.
+        overspend_tolerance (int): Max unflushed spend of a key.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, collection, flush_interval: float=1.0,
+                 overspend_tolerance: int=100) -> None:
+        """Initializer of class
+
+        Args:
+            collection (AsyncIOMotorCollection): Users collection.
+            flush_interval (float): Seconds between two flushes.
+            overspend_tolerance (int): Max unflushed spend of a key.
+
+        Returns:
+            None
+
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.overspend_tolerance = overspend_tolerance
+
+        self._state = {}
+        self._task = None
+        # Serializes flushes, so no spend is written twice or lost
+        self._lock = asyncio.Lock()
+
+        self.flushes = 0
+        self.failed = 0
+
+    @property
+    def running(self):
+        """Whether the flush task is running."""
+        return self._task is not None
+
+    async def start(self):
+        """Reconcile stored limits and start the flush task."""
+        if self._task is not None:
+            return
+        await self.reconcile()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and flush remaining spend."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def reconcile(self):
+        """Clamp limits overspent by a previous run back to zero."""
+        for limit_key in LIMIT_KEYS:
+            result = await self.collection.update_many(
+                {limit_key: {"$lt": 0}}, {"$set": {limit_key: 0}})
+            if result.modified_count:
+                self.logger.warning(
+                    f"Reconciled {result.modified_count} overspent " \
+                    f"{limit_key} values.")
+        self._state.clear()
+
+    async def _load(self, hashed_api_key: str):
+        """Get the counters of a key, loading them on first use."""
+        state = self._state.get(hashed_api_key)
+        if state is not None:
+            return state
+
+        projection = {key: 1 for key in LIMIT_KEYS + BUDGET_KEYS}
+        projection.update({"user_id": 1, "_id": 0})
+        doc = await self.collection.find_one({"api_key": hashed_api_key},
+                                             projection)
+        if doc is None:
+            return None
+
+        # Another coroutine may have loaded the key meanwhile
+        return self._state.setdefault(hashed_api_key, {
+            "user_id": doc.get("user_id"),
+            "remaining": {key: int(doc.get(key, 0)) for key in LIMIT_KEYS},
+            "pending": {key: 0 for key in LIMIT_KEYS},
+            "budgets": {key: doc.get(key) for key in BUDGET_KEYS},
+            "pending_budgets": {key: 0 for key in BUDGET_KEYS},
+            "active": True
+        })
+
+    async def reserve(self, hashed_api_key: str, limit_key: str, cost: int):
+        """Check and decrement the local limit of a key
+
+        Args:
+            hashed_api_key (str): Hashed API key of the user.
+            limit_key (str): Name of the limit field in the user document.
+            cost (int): Amount to reserve.
+
+        Returns:
+            dict: acknowledged is False when the limit has been surpassed.
+
+        """
+        state = await self._load(hashed_api_key)
+        if state is None or state["remaining"][limit_key] < cost or \
+                (limit_key == "request_limit" and self._over_budget(state)):
+            return {"message": "Limit has been surpassed. "\
+                               "Contact adminstration.",
+                    "acknowledged": False,
+                    "status_code": 429}
+
+        self._spend(state, limit_key, cost)
+        remaining = state["remaining"][limit_key]
+        if state["pending"][limit_key] >= self.overspend_tolerance:
+            await self.flush([hashed_api_key])
+
+        return {"message": f"Limit is {remaining}",
+                "acknowledged": True,
+                "status_code": 200}
+
+    async def update(self, hashed_api_key: str, limit_key: str, cost: int):
+        """Decrement the local limit of a key without checking it
+
+        A negative cost gives quota back to the user.
+        """
+        state = await self._load(hashed_api_key)
+        if state is None:
+            return {"message": "User does not exists.",
+                    "acknowledged": False,
+                    "status_code": 404}
+
+        self._spend(state, limit_key, cost)
+        return {"message": "Limit has been updated.",
+                "acknowledged": True,
+                "status_code": 200}
+
+    @staticmethod
+    def _over_budget(state: dict):
+        """Whether a token or spend budget of the key is used up."""
+        return any(budget is not None and budget <= 0
+                   for budget in state["budgets"].values())
+
+    async def charge(self, hashed_api_key: str, amounts: dict):
+        """Decrement the token and spend budgets of a key
+
+        Args:
+            hashed_api_key (str): Hashed API key of the user.
+            amounts (dict): Amount to charge keyed by budget field.
+
+        Returns:
+            dict: result of the update.
+
+        """
+        state = await self._load(hashed_api_key)
+        if state is None:
+            return {"message": "User does not exists.",
+                    "acknowledged": False,
+                    "status_code": 404}
+
+        for key, amount in amounts.items():
+            if state["budgets"][key] is not None:
+                state["budgets"][key] -= amount
+                state["pending_budgets"][key] += amount
+        state["active"] = True
+        return {"message": "Usage has been charged.",
+                "acknowledged": True,
+                "status_code": 200}
+
+    def _spend(self, state: dict, limit_key: str, cost: int):
+        """Move cost from the remaining limit to the unflushed spend."""
+        state["remaining"][limit_key] -= cost
+        state["pending"][limit_key] += cost
+        state["active"] = True
+
+    async def flush(self, hashed_api_keys: list=None):
+        """Write unflushed spend with one bulk write
+
+        Flushed keys are then reloaded so that limits changed in the
+        database are picked up.
+
+        Args:
+            hashed_api_keys (list): Keys to flush. All keys when None.
+
+        Returns:
+            None
+
+        """
+        async with self._lock:
+            await self._flush(hashed_api_keys)
+
+    async def _flush(self, hashed_api_keys: list=None):
+        """Write unflushed spend, must be called with the lock."""
+        if hashed_api_keys is None:
+            hashed_api_keys = list(self._state)
+
+        operations = []
+        flushed = {}
+        for hashed_api_key in hashed_api_keys:
+            state = self._state.get(hashed_api_key)
+            if state is None:
+                continue
+            pending = {key: value for key, value in state["pending"].items()
+                       if value}
+            pending_budgets = {key: value for key, value
+                               in state["pending_budgets"].items() if value}
+            if not pending and not pending_budgets:
+                continue
+            if pending:
+                operations.append(UpdateOne(
+                    {"api_key": hashed_api_key},
+                    {"$inc": {key: -value for key, value in pending.items()}}))
+            # Budgets removed meanwhile by an admin are not touched
+            for key, value in pending_budgets.items():
+                operations.append(UpdateOne(
+                    {"api_key": hashed_api_key, key: {"$type": "number"}},
+                    {"$inc": {key: -value}}))
+            flushed[hashed_api_key] = (pending, pending_budgets)
+            state["pending"] = {key: 0 for key in LIMIT_KEYS}
+            state["pending_budgets"] = {key: 0 for key in BUDGET_KEYS}
+
+        if not operations:
+            return
+
+        self.flushes += 1
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as exception:
+            self.failed += 1
+            self.logger.error(f"Flushing quota failed with {exception}")
+            for hashed_api_key, (pending, pending_budgets) in flushed.items():
+                state = self._state.get(hashed_api_key)
+                if state is not None:
+                    for key, value in pending.items():
+                        state["pending"][key] += value
+                    for key, value in pending_budgets.items():
+                        state["pending_budgets"][key] += value
+            return
+
+        dataset = self.collection.find(
+            {"api_key": {"$in": list(flushed)}},
+            {**{key: 1 for key in LIMIT_KEYS + BUDGET_KEYS},
+             "api_key": 1, "_id": 0})
+        for doc in await dataset.to_list(length=None):
+            state = self._state.get(doc["api_key"])
+            if state is None:
+                continue
+            for key in LIMIT_KEYS:
+                state["remaining"][key] = \
+                    int(doc.get(key, 0)) - state["pending"][key]
+            for key in BUDGET_KEYS:
+                budget = doc.get(key)
+                state["budgets"][key] = None if budget is None else \
+                    budget - state["pending_budgets"][key]
+
+    def _evict_idle(self):
+        """Drop keys without activity since the previous flush."""
+        for hashed_api_key, state in list(self._state.items()):
+            if state["active"]:
+                state["active"] = False
+            elif not any(state["pending"].values()) and \
+                    not any(state["pending_budgets"].values()):
+                del self._state[hashed_api_key]
+
+    async def invalidate_user(self, user_id: str, discard: bool=False):
+        """Drop the counters of a user, so they are reloaded on next use
+
+        Should be called around edits of the limits of the user and after
+        its deletion.
+
+        Args:
+            user_id (str): ID of the user.
+            discard (bool): Drop unflushed spend instead of writing it, for
+                deleted users.
+
+        Returns:
+            None
+
+        """
+        async with self._lock:
+            hashed_api_keys = [key for key, state in self._state.items()
+                               if state["user_id"] == user_id]
+            if not discard:
+                await self._flush(hashed_api_keys)
+            for hashed_api_key in hashed_api_keys:
+                state = self._state.get(hashed_api_key)
+                # Spend of a failed flush is kept for the next one
+                if state is not None and (discard or (
+                        not any(state["pending"].values()) and
+                        not any(state["pending_budgets"].values()))):
+                    del self._state[hashed_api_key]
+
+    async def _run(self):
+        """Flush periodically."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exception:
+                self.logger.error(f"Refreshing quota failed with {exception}")
+            self._evict_idle()
+
+    def stats(self):
+        """Get engine statistics
+
+        Returns:
+            dict: tracked keys, unflushed spend and flush counters.
+
+        """
+        return {"running": self.running,
+                "keys": len(self._state),
+                "pending": {key: sum(state["pending"][key]
+                                     for state in self._state.values())
+                            for key in LIMIT_KEYS},
+                "flushes": self.flushes,
+                "failed": self.failed}
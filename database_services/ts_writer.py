@@ -0,0 +1,152 @@
+"""This module buffers time-series records and writes them in batches."""
+import asyncio
+
+from logger.ve_logger import VeLogger
+
+
+_STOP = object()
+
+
+class TimeSeriesWriter:
+    """Write time-series records with insert_many from a background task.
+
+    Records are put on a bounded asyncio queue and flushed when a batch is
+    full or the oldest record of the batch has waited flush_interval seconds.
+    When the queue is full, new records are dropped and counted.
+
+    Attributes:
+        collection (AsyncIOMotorCollection): Collection to write records to.
+        batch_size (int): Max number of records per insert_many.
+        flush_interval (float): Max seconds a record waits before a flush.
+        max_queue_size (int): Max number of records waiting to be written.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, collection, batch_size: int=500,
+                 flush_interval: float=1.0,
+                 max_queue_size: int=100000) -> None:
+        """Initializer of class
+
+        Args:
+            collection (AsyncIOMotorCollection): Collection to write records.
+            batch_size (int): Max number of records per insert_many.
+            flush_interval (float): Max seconds a record waits before a flush.
+            max_queue_size (int): Max number of records waiting to be written.
+
+        Returns:
+            None
+
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+
+        self.queue = None
+        self._task = None
+        self._closing = False
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    @property
+    def running(self):
+        """Whether the background task accepts records."""
+        return self._task is not None and not self._closing
+
+    def start(self):
+        """Start the background task on the running event loop."""
+        if self._task is not None:
+            return
+        self._closing = False
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting records and wait for the queue to be drained."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def put(self, record: dict):
+        """Queue a record for writing
+
+        Args:
+            record (dict): Time-series document.
+
+        Returns:
+            bool: False if the record has been dropped.
+
+        """
+        if not self.running:
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _run(self):
+        """Collect batches from the queue and flush them."""
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            batch = []
+            record = await self.queue.get()
+            deadline = loop.time() + self.flush_interval
+            while True:
+                if record is _STOP:
+                    closing = True
+                    break
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        record = await asyncio.wait_for(self.queue.get(),
+                                                        timeout)
+                    except asyncio.TimeoutError:
+                        break
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        """Insert a batch of records."""
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as exception:
+            self.failed += len(batch)
+            self.logger.error(
+                f"Writing {len(batch)} time-series records failed with " \
+                f"{exception}")
+        self.flushes += 1
+
+    def stats(self):
+        """Get writer statistics
+
+        Returns:
+            dict: queue depth and counters of the writer.
+
+        """
+        return {"running": self.running,
+                "queue_depth": self.queue.qsize() if self.queue else 0,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes}
@@ -0,0 +1,161 @@
+"""This module shares invalidations of cached user data between processes."""
+import asyncio
+import datetime
+
+from logger.ve_logger import VeLogger
+
+
+# Seconds of invalidations read again at each read, covering writes still
+# in flight and clock skew between hosts
+READ_OVERLAP = 5.0
+
+
+class UserInvalidations:
+    """Invalidations of cached user data, shared through a collection.
+
+    A process editing or deleting a user publishes an invalidation. Every
+    process reads the invalidations published since its last read every
+    interval seconds and passes each one once to its listeners, so the
+    caches of all workers drop the user within interval seconds, whichever
+    worker served the admin call. Invalidations expire from the collection
+    through a TTL index.
+
+    Attributes:
+        collection (AsyncIOMotorCollection): Invalidations collection.
+        interval (float): Seconds between two reads.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, collection, interval: float=1.0) -> None:
+        """Initializer of class
+
+        Args:
+            collection (AsyncIOMotorCollection): Invalidations collection.
+            interval (float): Seconds between two reads.
+
+        Returns:
+            None
+
+        """
+        self.collection = collection
+        self.interval = interval
+
+        self._listeners = []
+        self._seen = {}
+        self._read_at = None
+        self._task = None
+
+        self.published = 0
+        self.applied = 0
+        self.failed = 0
+
+    @property
+    def running(self):
+        """Whether invalidations of other processes are read."""
+        return self._task is not None
+
+    def add_listener(self, listener):
+        """Call listener(user_id, discard) on each invalidation
+
+        Args:
+            listener (callable): Function or coroutine function, discard
+                tells the user was deleted.
+
+        Returns:
+            None
+
+        """
+        self._listeners.append(listener)
+
+    async def publish(self, user_id: str, discard: bool=False):
+        """Invalidate a user in all processes
+
+        The publishing process is expected to have invalidated its own
+        caches already, it skips its own invalidation.
+
+        Args:
+            user_id (str): ID of the user whose data changed.
+            discard (bool): Whether the user was deleted.
+
+        Returns:
+            None
+
+        """
+        now = datetime.datetime.now()
+        try:
+            result = await self.collection.insert_one(
+                {"user_id": user_id, "discard": discard, "created_at": now})
+        except Exception as exception:
+            self.failed += 1
+            self.logger.error(f"Publishing invalidation of {user_id} failed " \
+                              f"with {exception}")
+            return
+        self._seen[result.inserted_id] = now
+        self.published += 1
+
+    async def _apply(self, user_id: str, discard: bool):
+        """Pass an invalidation to the listeners."""
+        for listener in self._listeners:
+            try:
+                result = listener(user_id, discard)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as exception:
+                self.logger.error(f"Invalidating {user_id} failed with " \
+                                  f"{exception}")
+        self.applied += 1
+
+    async def _read(self):
+        """Apply the invalidations published since the last read."""
+        read_at = self._read_at
+        if read_at is None:
+            # Caches start empty, older invalidations do not matter
+            self._read_at = datetime.datetime.now()
+            return
+        since = read_at - datetime.timedelta(seconds=READ_OVERLAP)
+        dataset = self.collection.find({"created_at": {"$gte": since}})
+        for doc in await dataset.to_list(length=None):
+            read_at = max(read_at, doc["created_at"])
+            if doc["_id"] in self._seen:
+                continue
+            self._seen[doc["_id"]] = doc["created_at"]
+            await self._apply(doc["user_id"], doc.get("discard", False))
+        self._read_at = read_at
+        self._seen = {key: created_at for key, created_at
+                      in self._seen.items() if created_at >= since}
+
+    async def _run(self):
+        """Read periodically."""
+        while True:
+            try:
+                await self._read()
+            except Exception as exception:
+                self.failed += 1
+                self.logger.error(f"Reading invalidations failed with " \
+                                  f"{exception}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start reading on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop reading."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        """Get invalidation counters."""
+        return {"published": self.published,
+                "applied": self.applied,
+                "failed": self.failed}
@@ -1,4 +1,19 @@
 #!/bin/sh
 set -e
-exec python3 ./app.py &
-exec python3 ./app_admin.py
+
+python3 ./app.py &
+app_pid=$!
+python3 ./app_admin.py &
+admin_pid=$!
+
+# Drain both servers on shutdown, reload the gateway workers on HUP.
+# USR2 would replace the master watched below, so it reloads with HUP too.
+trap 'kill -TERM $app_pid $admin_pid 2>/dev/null' TERM INT
+trap 'kill -HUP $app_pid 2>/dev/null' HUP USR2
+
+# wait returns early when a trapped signal arrives
+while kill -0 $app_pid 2>/dev/null; do
+    wait $app_pid || true
+done
+kill -TERM $app_pid $admin_pid 2>/dev/null || true
+wait
@@ -0,0 +1,268 @@
+"""This module paces upstream calls under the upstream rate limits."""
+import asyncio
+import math
+import time
+
+
+class AdmissionError(Exception):
+    """Raised when a call would wait too long for upstream rate limits.
+
+    Attributes:
+        retry_after (float): Seconds until the limits allow the call.
+
+    """
+
+    def __init__(self, message: str, retry_after: float=1.0) -> None:
+        """Initializer of class"""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(kwargs: dict):
+    """Estimate tokens an upstream call counts against the token limit
+
+    The upstream counts the prompt plus max_tokens of the completion. The
+    prompt is estimated at 4 characters per token, the rate-limit headers
+    of the responses correct the drift.
+
+    Args:
+        kwargs (dict): Arguments of the upstream call.
+
+    Returns:
+        int: estimated tokens.
+
+    """
+    def characters(value):
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, dict):
+            return sum(characters(item) for item in value.values())
+        if isinstance(value, list):
+            return sum(characters(item) if not isinstance(item, int) else 4
+                       for item in value)
+        return 0
+
+    prompt = kwargs.get("messages") or kwargs.get("prompt") or \
+             kwargs.get("input")
+    completion = kwargs.get("max_tokens") or 0
+    return max(1, characters(prompt) // 4) + \
+        completion * (kwargs.get("n") or 1)
+
+
+class TokenBucket:
+    """Token bucket refilled to capacity once per minute.
+
+    The level may go below zero. A caller taking more than the level gets
+    the seconds until the bucket is back to zero, which is when its share
+    of the limit is available.
+
+    Attributes:
+        capacity (float): Tokens per minute.
+        level (float): Tokens available now.
+
+    """
+
+    def __init__(self, capacity: float) -> None:
+        """Initializer of class"""
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level +
+                         (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+
+    def wait_time(self, amount: float):
+        """Seconds until amount could be taken, without taking it."""
+        self._refill()
+        return max(0.0, amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float):
+        """Take tokens, return seconds to wait before using them."""
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level) * 60 / self.capacity
+
+    def give(self, amount: float):
+        """Give back tokens taken by a call that was not made."""
+        self.level = min(self.capacity, self.level + amount)
+
+    def correct(self, capacity: float, remaining: float):
+        """Align the bucket to rate-limit headers of the upstream
+
+        Args:
+            capacity (float): Limit per minute reported by the upstream.
+            remaining (float): Tokens left reported by the upstream.
+
+        Returns:
+            None
+
+        """
+        self._refill()
+        if capacity:
+            self.capacity = capacity
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+
+class AdmissionController:
+    """Requests-per-minute and tokens-per-minute pacing of upstream calls.
+
+    Each pair of API key and model gets one bucket of requests and one of
+    estimated tokens. They are seeded from default_rpm and default_tpm, or
+    from the `x-ratelimit-*` headers of the first response, and corrected by
+    the headers of every later response. A call that would exceed a limit
+    waits until the limit allows it instead of getting a 429, and a call
+    that would wait longer than max_wait fails right away. With several
+    workers calling the same keys, each worker paces its share of every
+    limit.
+
+    Attributes:
+        max_wait (float): Max seconds a call waits for the limits.
+        default_rpm (int): Requests per minute before the upstream reported
+            a limit, None to not pace until then.
+        default_tpm (int): Tokens per minute before the upstream reported a
+            limit, None to not pace until then.
+        share (float): Part of the limits paced by this worker.
+
+    """
+
+    def __init__(self, max_wait: float=10.0, default_rpm: int=None,
+                 default_tpm: int=None, share: float=1.0) -> None:
+        """Initializer of class
+
+        Args:
+            max_wait (float): Max seconds a call waits for the limits.
+            default_rpm (int): Requests per minute until one is reported.
+            default_tpm (int): Tokens per minute until one is reported.
+            share (float): Part of the limits paced by this worker, 1 over
+                the number of workers.
+
+        Returns:
+            None
+
+        """
+        self.max_wait = max_wait
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.share = share
+        self.buckets = {}
+        self.admitted = 0
+        self.paced = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+
+    def _buckets(self, api_key: str, model: str):
+        """Get the request and token buckets of a key and model."""
+        buckets = self.buckets.get((api_key, model))
+        if buckets is None:
+            buckets = {
+                "requests": TokenBucket(self.default_rpm * self.share) \
+                            if self.default_rpm else None,
+                "tokens": TokenBucket(self.default_tpm * self.share) \
+                          if self.default_tpm else None}
+            self.buckets[(api_key, model)] = buckets
+        return buckets
+
+    def wait_time(self, api_key: str, model: str, tokens: int):
+        """Seconds a call would wait for the limits of a key and model
+
+        Args:
+            api_key (str): Key of the call.
+            model (str): Model of the call.
+            tokens (int): Estimated tokens of the call.
+
+        Returns:
+            float: seconds to wait, 0 when the call can go now.
+
+        """
+        buckets = self._buckets(api_key, model)
+        return max([bucket.wait_time(amount) for bucket, amount in
+                    ((buckets["requests"], 1), (buckets["tokens"], tokens))
+                    if bucket is not None], default=0.0)
+
+    async def admit(self, api_key: str, model: str, tokens: int):
+        """Wait until the upstream limits allow a call
+
+        Args:
+            api_key (str): Key of the call.
+            model (str): Model of the call.
+            tokens (int): Estimated tokens of the call.
+
+        Returns:
+            None
+
+        Raises:
+            AdmissionError: When the call would wait longer than max_wait.
+
+        """
+        buckets = self._buckets(api_key, model)
+        taken = [(bucket, amount) for bucket, amount in
+                 ((buckets["requests"], 1), (buckets["tokens"], tokens))
+                 if bucket is not None]
+        wait = max([bucket.take(amount) for bucket, amount in taken],
+                   default=0.0)
+        if wait > self.max_wait:
+            for bucket, amount in taken:
+                bucket.give(amount)
+            self.rejected += 1
+            raise AdmissionError(f"Upstream rate limit of {model} reached, " \
+                                 f"try again in {math.ceil(wait)}s.", wait)
+
+        self.admitted += 1
+        if wait > 0:
+            self.paced += 1
+            self.wait_total += wait
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                for bucket, amount in taken:
+                    bucket.give(amount)
+                raise
+
+    def update_from_headers(self, api_key: str, model: str, headers):
+        """Correct the buckets of a key and model from response headers
+
+        Args:
+            api_key (str): Key of the call.
+            model (str): Model of the call.
+            headers (Mapping): Response headers.
+
+        Returns:
+            None
+
+        """
+        buckets = self._buckets(api_key, model)
+        for name in ("requests", "tokens"):
+            try:
+                limit = headers.get(f"x-ratelimit-limit-{name}")
+                limit = float(limit) if limit is not None else None
+                remaining = headers.get(f"x-ratelimit-remaining-{name}")
+                remaining = float(remaining) \
+                            if remaining is not None else None
+            except ValueError:
+                continue
+            # The upstream reports the limits of the key over all workers
+            limit = limit * self.share if limit is not None else None
+            remaining = remaining * self.share \
+                        if remaining is not None else None
+            if buckets[name] is None:
+                if not limit:
+                    continue
+                buckets[name] = TokenBucket(limit)
+            buckets[name].correct(limit, remaining)
+
+    def stats(self):
+        """Get pacing statistics and bucket levels."""
+        return {"admitted": self.admitted,
+                "paced": self.paced,
+                "rejected": self.rejected,
+                "avg_wait": self.wait_total / self.paced \
+                            if self.paced else 0.0,
+                "buckets": {f"...{api_key[-4:]}/{model}": {
+                    name: {"capacity": bucket.capacity,
+                           "level": round(bucket.level, 1)}
+                    for name, bucket in buckets.items() if bucket is not None}
+                    for (api_key, model), buckets in self.buckets.items()}}
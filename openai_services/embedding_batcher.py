@@ -0,0 +1,127 @@
+"""This module coalesces concurrent embedding requests."""
+import asyncio
+
+from logger.ve_logger import VeLogger
+
+
+class EmbeddingBatcher:
+    """Gather concurrent small embedding requests into one upstream call.
+
+    Requests for the same model (and `user`) that arrive within window
+    seconds of the first one are sent as a single list input. The vectors of
+    the response are split back to each waiting caller.
+
+    Attributes:
+        create (callable): Coroutine function making the upstream call.
+        window (float): Seconds to wait for more requests.
+        max_batch_inputs (int): Inputs that dispatch a batch right away.
+        max_request_inputs (int): Max inputs of a request to be batched.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, create, window: float=0.005,
+                 max_batch_inputs: int=256,
+                 max_request_inputs: int=16) -> None:
+        """Initializer of class
+
+        Args:
+            create (callable): Coroutine function making the upstream call.
+            window (float): Seconds to wait for more requests.
+            max_batch_inputs (int): Inputs that dispatch a batch right away.
+            max_request_inputs (int): Max inputs of a request to be batched.
+
+        Returns:
+            None
+
+        """
+        self.create = create
+        self.window = window
+        self.max_batch_inputs = max_batch_inputs
+        self.max_request_inputs = max_request_inputs
+
+        self._pending = {}
+        self._tasks = set()
+
+        self.batches = 0
+        self.requests = 0
+        self.inputs = 0
+
+    def accepts(self, texts: list):
+        """Whether a request of texts is small enough to be batched."""
+        return len(texts) <= self.max_request_inputs
+
+    async def embed(self, model: str, texts: list, user: str=None):
+        """Get embeddings of texts through a shared upstream call
+
+        Args:
+            model (str): Embedding model.
+            texts (list): Input strings.
+            user (str): End-user identifier passed to openai.
+
+        Returns:
+            list: embedding of each text.
+
+        Raises:
+            Exception: Error of the upstream call.
+
+        """
+        loop = asyncio.get_running_loop()
+        key = (model, user)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = {"texts": [], "waiters": []}
+            batch["timer"] = loop.call_later(self.window, self._dispatch, key)
+            self._pending[key] = batch
+
+        future = loop.create_future()
+        batch["waiters"].append((future, len(batch["texts"]), len(texts)))
+        batch["texts"].extend(texts)
+        if len(batch["texts"]) >= self.max_batch_inputs:
+            batch["timer"].cancel()
+            self._dispatch(key)
+
+        return await future
+
+    def _dispatch(self, key: tuple):
+        """Send the pending batch of key."""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        task = asyncio.create_task(self._send(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: tuple, batch: dict):
+        """Make the upstream call and resolve waiters."""
+        model, user = key
+        kwargs = {"model": model, "input": batch["texts"]}
+        if user is not None:
+            kwargs["user"] = user
+
+        self.batches += 1
+        self.requests += len(batch["waiters"])
+        self.inputs += len(batch["texts"])
+        try:
+            openai_result = await self.create(**kwargs)
+            vectors = [item["embedding"] for item in sorted(
+                openai_result["data"], key=lambda item: item["index"])]
+        except Exception as exception:
+            for future, _, _ in batch["waiters"]:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+
+        for future, start, count in batch["waiters"]:
+            if not future.done():
+                future.set_result(vectors[start:start + count])
+
+    def stats(self):
+        """Get batcher statistics."""
+        return {"batches": self.batches,
+                "requests": self.requests,
+                "inputs": self.inputs,
+                "requests_per_batch": self.requests / self.batches \
+                                      if self.batches else 0.0}
@@ -0,0 +1,199 @@
+"""This module caches embeddings in memory and on disk."""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from logger.ve_logger import VeLogger
+from utils.lru_cache import TTLCache
+
+
+# Keys per query, below the variable limit of old SQLite builds (999)
+READ_CHUNK_SIZE = 500
+
+
+class EmbeddingCache:
+    """Content-addressed cache of embedding vectors.
+
+    Vectors are keyed by a hash of (model, input string) and stored as
+    float32 bytes. The memory tier is a bounded LRU, the optional disk tier
+    is an SQLite database that survives restarts.
+
+    Attributes:
+        memory (TTLCache): In-memory tier.
+        disk_path (str): Path of the SQLite database, None disables it.
+        max_disk_entries (int): Max number of vectors kept on disk.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, max_memory_entries: int=10000, ttl: float=86400.0,
+                 disk_path: str=None, max_disk_entries: int=1000000) -> None:
+        """Initializer of class
+
+        Args:
+            max_memory_entries (int): Max number of vectors kept in memory.
+            ttl (float): Seconds a vector stays in the memory tier.
+            disk_path (str): Path of the SQLite database.
+            max_disk_entries (int): Max number of vectors kept on disk.
+
+        Returns:
+            None
+
+        """
+        self.memory = TTLCache(max_size=max_memory_entries, ttl=ttl)
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self.disk_hits = 0
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._disk_entries = 0
+
+    def _db(self):
+        """Get the SQLite connection of this process, opening it if needed.
+
+        Workers forked from a preloaded app must not share a connection, so
+        it is opened lazily by each process. Must be called with the lock.
+        """
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.disk_path,
+                                               check_same_thread=False)
+            self._connection_pid = os.getpid()
+            # WAL lets worker processes read while another one writes
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB, created REAL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_created "
+                "ON embeddings (created)")
+            self._connection.commit()
+            self._disk_entries = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._connection
+
+    @staticmethod
+    def _key(model: str, text: str):
+        """Hash model and input into a cache key."""
+        return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+    @staticmethod
+    def _pack(vector: list):
+        """Pack a vector into float32 bytes."""
+        return array('f', vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes):
+        """Unpack float32 bytes into a vector."""
+        vector = array('f')
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _read_disk(self, keys: list):
+        """Read vectors of keys from disk."""
+        found = {}
+        with self._lock:
+            connection = self._db()
+            for start in range(0, len(keys), READ_CHUNK_SIZE):
+                chunk = keys[start:start + READ_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(connection.execute(
+                    f"SELECT key, vector FROM embeddings "
+                    f"WHERE key IN ({placeholders})", chunk).fetchall())
+        return found
+
+    def _write_disk(self, items: list):
+        """Write (key, blob) items to disk, dropping the oldest if full."""
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            # A key holds the same vector whenever it is written, so only
+            # new keys are inserted and counted
+            changes = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?)",
+                [(key, blob, now) for key, blob in items])
+            self._disk_entries += connection.total_changes - changes
+            if self._disk_entries > self.max_disk_entries:
+                connection.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM "
+                    "embeddings ORDER BY created LIMIT ?)",
+                    (self._disk_entries - self.max_disk_entries,))
+                self._disk_entries = connection.execute(
+                    "SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            connection.commit()
+
+    async def get_many(self, model: str, texts: list):
+        """Get cached vectors of texts
+
+        Args:
+            model (str): Embedding model.
+            texts (list): Input strings.
+
+        Returns:
+            list: vector of each text, None for misses.
+
+        """
+        keys = [self._key(model, text) for text in texts]
+        blobs = [self.memory.get(key) for key in keys]
+
+        missing = [key for key, blob in zip(keys, blobs) if blob is None]
+        if missing and self.disk_path:
+            try:
+                found = await asyncio.to_thread(self._read_disk, missing)
+            except sqlite3.Error as exception:
+                self.logger.error(f"Reading embeddings failed with " \
+                                  f"{exception}")
+                found = {}
+            for index, key in enumerate(keys):
+                if blobs[index] is None and key in found:
+                    blobs[index] = found[key]
+                    self.memory.set(key, found[key])
+                    self.disk_hits += 1
+
+        return [None if blob is None else self._unpack(blob)
+                for blob in blobs]
+
+    async def set_many(self, model: str, texts: list, vectors: list):
+        """Cache vectors of texts
+
+        Args:
+            model (str): Embedding model.
+            texts (list): Input strings.
+            vectors (list): Embedding of each text.
+
+        Returns:
+            None
+
+        """
+        items = [(self._key(model, text), self._pack(vector))
+                 for text, vector in zip(texts, vectors)]
+        for key, blob in items:
+            self.memory.set(key, blob)
+
+        if self.disk_path:
+            try:
+                await asyncio.to_thread(self._write_disk, items)
+            except sqlite3.Error as exception:
+                self.logger.error(f"Writing embeddings failed with " \
+                                  f"{exception}")
+
+    def close(self):
+        """Close the disk tier."""
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+            self._connection = None
+
+    def stats(self):
+        """Get cache statistics."""
+        return {"memory": self.memory.stats(),
+                "disk_hits": self.disk_hits,
+                "disk_entries": self._disk_entries}
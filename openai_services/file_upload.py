@@ -0,0 +1,74 @@
+"""This module validates and streams file uploads in bounded chunks."""
+import asyncio
+import json
+
+
+def validate_jsonl(file, buffer_size: int=1048576):
+    """Check that a file holds one JSON object per line
+
+    The file is read buffer_size bytes at a time, so a line may not be
+    longer than buffer_size. The file is rewound afterwards.
+
+    Args:
+        file (BinaryIO): File to validate.
+        buffer_size (int): Bytes read at once.
+
+    Returns:
+        int: number of JSON lines.
+
+    Raises:
+        ValueError: When the file is empty or a line is not a JSON object.
+
+    """
+    def check(line: bytes, line_number: int):
+        try:
+            record = json.loads(line)
+        except ValueError as exception:
+            raise ValueError(f"Line {line_number} is not valid JSON: " \
+                             f"{exception}") from exception
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object.")
+
+    line_number = 0
+    records = 0
+    rest = b""
+    while True:
+        chunk = file.read(buffer_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                check(line, line_number)
+                records += 1
+        if len(rest) > buffer_size:
+            raise ValueError(f"Line {line_number + 1} is longer than " \
+                             f"{buffer_size} bytes.")
+    if rest.strip():
+        check(rest, line_number + 1)
+        records += 1
+    file.seek(0)
+
+    if records == 0:
+        raise ValueError("File has no JSON lines.")
+    return records
+
+
+async def file_chunks(file, buffer_size: int=1048576):
+    """Read a file buffer_size bytes at a time off the event loop
+
+    Args:
+        file (BinaryIO): File to read.
+        buffer_size (int): Bytes read at once.
+
+    Yields:
+        bytes: Chunks of the file.
+
+    """
+    while True:
+        chunk = await asyncio.to_thread(file.read, buffer_size)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,380 @@
+"""This module tracks fine-tune jobs and notifies their subscribers."""
+import asyncio
+import datetime
+import os
+import socket
+import time
+import uuid
+
+from logger.ve_logger import VeLogger
+
+
+# Statuses after which a fine-tune job does not change anymore
+FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+# Name of the lease held by the worker polling fine-tune jobs
+LEASE_NAME = "fine_tune_tracker"
+# Seconds of updates read again at each sync, covering writes still in
+# flight and clock skew between hosts
+SYNC_OVERLAP = 5.0
+
+
+class FineTuneTracker:
+    """Fine-tune jobs polled once for all workers and mirrored in each.
+
+    The worker holding the lease of the tracker in the store polls the
+    active jobs upstream. A job is polled min_interval seconds after it
+    changed, and the interval doubles up to max_interval while it stays the
+    same. Each change is saved to the store, which increments the revision
+    of the job.
+
+    Every worker mirrors the active jobs of the store: every sync_interval
+    seconds it reads the jobs updated since its last sync and wakes the
+    clients waiting on the ones with a newer revision, so clients neither
+    poll openai nor the store themselves. Jobs leave the mirror once they
+    reach a final status.
+
+    Attributes:
+        min_interval (float): Seconds between polls of a changing job.
+        max_interval (float): Max seconds between polls of a job.
+        concurrency (int): Max jobs polled at once.
+        sync_interval (float): Seconds between two syncs of the mirror.
+        lease_ttl (float): Seconds the lease is held unless renewed, it is
+            renewed every third of it.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, retrieve, store, min_interval: float=10.0,
+                 max_interval: float=300.0, concurrency: int=8,
+                 sync_interval: float=1.0, lease_ttl: float=30.0) -> None:
+        """Initializer of class
+
+        Args:
+            retrieve (callable): Coroutine function getting a fine-tune job
+                as a dict by id.
+            store (DatabaseService): Store of the jobs and of the lease.
+            min_interval (float): Seconds between polls of a changing job.
+            max_interval (float): Max seconds between polls of a job.
+            concurrency (int): Max jobs polled at once.
+            sync_interval (float): Seconds between two syncs of the mirror.
+            lease_ttl (float): Seconds the lease is held unless renewed.
+
+        Returns:
+            None
+
+        """
+        self.retrieve = retrieve
+        self.store = store
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.concurrency = concurrency
+        self.sync_interval = sync_interval
+        self.lease_ttl = lease_ttl
+        self.jobs = {}
+        self.leader = False
+        self.owner = None
+        self._synced_at = None
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self.polls = 0
+        self.changes = 0
+        self.syncs = 0
+        self.errors = 0
+
+    @staticmethod
+    def _final(fine_tune: dict):
+        """Whether a job does not change anymore."""
+        return fine_tune is not None and \
+            fine_tune.get("status") in FINAL_STATUSES
+
+    async def track(self, fine_tune_id: str, user_id: str=None,
+                    fine_tune: dict=None):
+        """Have a job polled soon by the worker holding the lease
+
+        Args:
+            fine_tune_id (str): id of the fine-tuning process.
+            user_id (str): ID of the user who created the job.
+            fine_tune (dict): State of a job just created, saved at
+                revision 0.
+
+        Returns:
+            None
+
+        """
+        try:
+            if fine_tune is not None:
+                await self.store.create_fine_tune(fine_tune, user_id)
+                self._mirror(fine_tune_id, 0, fine_tune, user_id)
+            else:
+                await self.store.request_fine_tune_poll(fine_tune_id)
+        except Exception as exception:
+            self.errors += 1
+            self.logger.error(f"Tracking fine-tune {fine_tune_id} failed " \
+                              f"with {exception}")
+            return
+        if self.leader:
+            self._schedule(fine_tune_id)
+
+    async def wait(self, fine_tune_id: str, since: int=0,
+                   timeout: float=30.0):
+        """Wait until a job has a revision newer than since
+
+        Args:
+            fine_tune_id (str): id of the fine-tuning process.
+            since (int): Revision the client already has.
+            timeout (float): Max seconds to wait.
+
+        Returns:
+            tuple: (revision, fine_tune) of the job once newer than since,
+                final or after timeout, None if the job is not saved.
+
+        """
+        job = self.jobs.get(fine_tune_id)
+        if job is None:
+            job = await self._load(fine_tune_id)
+            if job is None:
+                return None
+        if job["revision"] <= since and not self._final(job["fine_tune"]):
+            try:
+                await asyncio.wait_for(job["changed"].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job["revision"], job["fine_tune"]
+
+    async def subscribe(self, fine_tune_id: str, since: int=0,
+                        timeout: float=30.0):
+        """Yield each new revision of a job until it is final
+
+        Args:
+            fine_tune_id (str): id of the fine-tuning process.
+            since (int): Revision the client already has.
+            timeout (float): Seconds after which the current revision is
+                yielded again, to keep the connection alive.
+
+        Yields:
+            tuple: (revision, fine_tune) of the job.
+
+        """
+        while True:
+            result = await self.wait(fine_tune_id, since, timeout)
+            if result is None:
+                return
+            since = result[0]
+            if result[1] is None:
+                continue
+            yield result
+            if self._final(result[1]):
+                return
+
+    async def _load(self, fine_tune_id: str):
+        """Get a job missing from the mirror from the store."""
+        result = await self.store.retrieve_fine_tune(fine_tune_id)
+        if result['acknowledged'] is False:
+            return None
+        doc = result['data']
+        job = self._mirror(fine_tune_id, doc.get("revision", 0),
+                           doc.get("fine_tune"), doc.get("user_id"))
+        if job is None:
+            # Final jobs are not mirrored
+            return {"revision": doc.get("revision", 0),
+                    "fine_tune": doc.get("fine_tune")}
+        return job
+
+    def _mirror(self, fine_tune_id: str, revision: int, fine_tune: dict,
+                user_id: str=None):
+        """Update the mirror of a job, waking its clients if it is newer.
+
+        Returns:
+            dict: Mirrored job, None once the job is final.
+
+        """
+        job = self.jobs.get(fine_tune_id)
+        if job is None:
+            if self._final(fine_tune):
+                return None
+            job = {"user_id": user_id, "fine_tune": fine_tune,
+                   "revision": revision, "changed": asyncio.Event(),
+                   "interval": self.min_interval,
+                   "next_poll": time.monotonic(),
+                   "poll_requested_at": None}
+            self.jobs[fine_tune_id] = job
+            self._wakeup.set()
+        elif revision > job["revision"]:
+            job["revision"], job["fine_tune"] = revision, fine_tune
+            changed, job["changed"] = job["changed"], asyncio.Event()
+            changed.set()
+
+        if self._final(job["fine_tune"]):
+            self.jobs.pop(fine_tune_id, None)
+            return None
+        return job
+
+    def _schedule(self, fine_tune_id: str):
+        """Poll a job right away."""
+        job = self.jobs.get(fine_tune_id)
+        if job is None:
+            return
+        job["interval"] = self.min_interval
+        job["next_poll"] = time.monotonic()
+        self._wakeup.set()
+
+    @staticmethod
+    def _fingerprint(fine_tune: dict):
+        """Get the parts of a job that tell it changed."""
+        if fine_tune is None:
+            return None
+        return (fine_tune.get("status"), fine_tune.get("updated_at"),
+                len(fine_tune.get("events") or []),
+                fine_tune.get("fine_tuned_model"))
+
+    async def _poll(self, fine_tune_id: str):
+        """Poll a job, saving and announcing its changes."""
+        job = self.jobs.get(fine_tune_id)
+        if job is None:
+            return
+        self.polls += 1
+        try:
+            fine_tune = await self.retrieve(fine_tune_id)
+            if self._fingerprint(fine_tune) == \
+                    self._fingerprint(job["fine_tune"]):
+                job["interval"] = min(job["interval"] * 2, self.max_interval)
+            else:
+                # Saved first, the job is polled again if saving fails
+                result = await self.store.save_fine_tune(fine_tune,
+                                                         job["user_id"])
+                self.changes += 1
+                job["interval"] = self.min_interval
+                self._mirror(fine_tune_id, result['data']['revision'],
+                             fine_tune)
+        except Exception as exception:
+            self.errors += 1
+            self.logger.warning(f"Polling fine-tune {fine_tune_id} failed " \
+                                f"with {exception}")
+            job["interval"] = min(job["interval"] * 2, self.max_interval)
+        job["next_poll"] = time.monotonic() + job["interval"]
+
+    async def _run(self):
+        """Poll due jobs while leading, sleeping until the next one is due."""
+        while True:
+            now = time.monotonic()
+            next_poll = None
+            if self.leader:
+                due = sorted((job["next_poll"], fine_tune_id)
+                             for fine_tune_id, job in self.jobs.items()
+                             if job["next_poll"] <= now)
+                if due:
+                    await asyncio.gather(*(
+                        self._poll(fine_tune_id)
+                        for _, fine_tune_id in due[:self.concurrency]))
+                    continue
+                next_poll = min((job["next_poll"]
+                                 for job in self.jobs.values()),
+                                default=None)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    None if next_poll is None else next_poll - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sync(self):
+        """Mirror the jobs updated in the store since the last sync."""
+        synced_at = self._synced_at
+        if synced_at is None:
+            synced_at = datetime.datetime.now()
+            docs = await self.store.find_active_fine_tunes()
+        else:
+            docs = await self.store.find_updated_fine_tunes(
+                synced_at - datetime.timedelta(seconds=SYNC_OVERLAP))
+
+        for doc in docs:
+            synced_at = max(synced_at, doc.get("updated_at", synced_at))
+            job = self._mirror(doc["id"], doc.get("revision", 0),
+                               doc.get("fine_tune"), doc.get("user_id"))
+            requested_at = doc.get("poll_requested_at")
+            if job is not None and requested_at is not None and \
+                    requested_at != job["poll_requested_at"]:
+                job["poll_requested_at"] = requested_at
+                if self.leader:
+                    self._schedule(doc["id"])
+        self._synced_at = synced_at
+        self.syncs += 1
+
+    async def _elect(self):
+        """Take or renew the lease, polling all jobs once it is taken."""
+        try:
+            leader = await self.store.acquire_lease(LEASE_NAME, self.owner,
+                                                    self.lease_ttl)
+        except Exception as exception:
+            self.errors += 1
+            self.logger.warning(f"Renewing the fine-tune lease failed " \
+                                f"with {exception}")
+            leader = False
+
+        if leader and not self.leader:
+            self.logger.info(f"Fine-tune jobs are polled by {self.owner}")
+            self.leader = True
+            for fine_tune_id in list(self.jobs):
+                self._schedule(fine_tune_id)
+        elif self.leader and not leader:
+            self.logger.warning(f"Fine-tune lease lost by {self.owner}")
+            self.leader = False
+            self._wakeup.set()
+
+    async def _coordinate(self):
+        """Sync the mirror every sync_interval and renew the lease."""
+        renew_at = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= renew_at:
+                await self._elect()
+                renew_at = now + self.lease_ttl / 3
+            try:
+                await self._sync()
+            except Exception as exception:
+                self.errors += 1
+                self.logger.warning(f"Syncing fine-tunes failed with " \
+                                    f"{exception}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def start(self):
+        """Start mirroring jobs and compete for the lease."""
+        if self._tasks:
+            return
+        # Set here, after the worker process is forked
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:" \
+                     f"{uuid.uuid4().hex[:8]}"
+        self._tasks = [asyncio.create_task(self._coordinate()),
+                       asyncio.create_task(self._run())]
+
+    async def stop(self):
+        """Stop the loops, handing the lease over to another worker."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+        if self.leader:
+            self.leader = False
+            try:
+                await self.store.release_lease(LEASE_NAME, self.owner)
+            except Exception as exception:
+                self.logger.warning(f"Releasing the fine-tune lease failed " \
+                                    f"with {exception}")
+
+    def stats(self):
+        """Get tracker statistics."""
+        return {"active": len(self.jobs),
+                "leader": self.leader,
+                "polls": self.polls,
+                "changes": self.changes,
+                "syncs": self.syncs,
+                "errors": self.errors}
@@ -0,0 +1,106 @@
+"""This module owns the pooled HTTP transport of openai calls."""
+import aiohttp
+import openai
+
+
+class HttpTransport:
+    """Shared aiohttp session used by every openai call of the process.
+
+    The openai client opens a new session, and so a new TLS connection, for
+    each call unless a session is set on `openai.aiosession`. This class
+    keeps one keep-alive pool and binds it to the context of each call.
+
+    Attributes:
+        max_connections (int): Max open connections, 0 means unlimited.
+        max_connections_per_host (int): Max open connections to one host.
+        keepalive_timeout (float): Seconds an idle connection is kept.
+        connect_timeout (float): Seconds to establish a connection.
+        read_timeout (float): Seconds a request may take in total.
+        session (aiohttp.ClientSession): The shared session.
+
+    """
+
+    def __init__(self, max_connections: int=100,
+                 max_connections_per_host: int=0,
+                 keepalive_timeout: float=30.0,
+                 connect_timeout: float=10.0,
+                 read_timeout: float=600.0) -> None:
+        """Initializer of class
+
+        Args:
+            max_connections (int): Max open connections.
+            max_connections_per_host (int): Max open connections to a host.
+            keepalive_timeout (float): Seconds an idle connection is kept.
+            connect_timeout (float): Seconds to establish a connection.
+            read_timeout (float): Seconds a request may take in total.
+
+        Returns:
+            None
+
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = None
+        self._listeners = []
+
+    def add_response_listener(self, listener):
+        """Call listener(request_headers, response) on each response.
+
+        Listeners are called once the response headers are received.
+        """
+        self._listeners.append(listener)
+
+    async def _on_request_end(self, session, context, params):
+        """Forward a received response to the listeners."""
+        for listener in self._listeners:
+            listener(params.headers, params.response)
+
+    @property
+    def request_timeout(self):
+        """Per-request (connect, total) timeout understood by openai."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def start(self):
+        """Open the shared session on the running event loop."""
+        if self.session is not None:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300)
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(self._on_request_end)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[trace_config],
+            timeout=aiohttp.ClientTimeout(total=self.read_timeout,
+                                          connect=self.connect_timeout))
+
+    async def close(self):
+        """Close the shared session and its connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def bind(self):
+        """Make openai calls of the current context use the session."""
+        if self.session is not None:
+            openai.aiosession.set(self.session)
+
+    def stats(self):
+        """Get pool statistics."""
+        if self.session is None:
+            return {"open": False}
+        connector = self.session.connector
+        idle = getattr(connector, "_conns", {})
+        acquired = getattr(connector, "_acquired", ())
+        return {"open": True,
+                "limit": connector.limit,
+                "limit_per_host": connector.limit_per_host,
+                "in_use": len(acquired),
+                "idle": sum(len(conns) for conns in idle.values()),
+                "hosts": len(idle)}
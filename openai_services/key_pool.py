@@ -0,0 +1,164 @@
+"""This module balances upstream calls over a pool of openai API keys."""
+import time
+
+
+class KeyPool:
+    """Pool of upstream API keys with per-key rate tracking.
+
+    Each call takes the eligible key with the lowest load, either the fewest
+    calls in flight or the most remaining requests reported by the upstream
+    `x-ratelimit-*` headers. A key that receives a 429 is cooled down until
+    its `retry-after` has passed.
+
+    Attributes:
+        strategy (str): "least_loaded" or "remaining_quota".
+        default_cooldown (float): Cooldown in seconds when a 429 carries no
+            retry-after header.
+
+    """
+
+    STRATEGIES = ("least_loaded", "remaining_quota")
+
+    def __init__(self, api_keys: list, strategy: str="least_loaded",
+                 default_cooldown: float=10.0) -> None:
+        """Initializer of class
+
+        Args:
+            api_keys (list): Keys as strings, or "key:model1|model2" to
+                restrict a key to some models.
+            strategy (str): "least_loaded" or "remaining_quota".
+            default_cooldown (float): Cooldown in seconds of a 429 without
+                a retry-after header.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: When no key is provided or strategy is unknown.
+
+        """
+        if not api_keys:
+            raise ValueError("Provide at least one API key for the pool.")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Key pool strategy should be one of " \
+                             f"{self.STRATEGIES}.")
+
+        self.strategy = strategy
+        self.default_cooldown = default_cooldown
+        self.keys = {}
+        for entry in api_keys:
+            api_key, _, models = entry.strip().partition(":")
+            self.keys[api_key] = {
+                "models": set(models.split("|")) if models else None,
+                "in_flight": 0,
+                "requests": 0,
+                "rate_limited": 0,
+                "cooldown_until": 0.0,
+                "limit_requests": None,
+                "limit_tokens": None,
+                "remaining_requests": None,
+                "remaining_tokens": None,
+                "updated_at": None,
+            }
+
+    def _eligible(self, model: str=None):
+        """Get keys allowed for model, preferring keys not cooling down."""
+        allowed = [(api_key, state) for api_key, state in self.keys.items()
+                   if model is None or state["models"] is None
+                   or model in state["models"]]
+        now = time.monotonic()
+        ready = [item for item in allowed if item[1]["cooldown_until"] <= now]
+        return ready or allowed
+
+    def acquire(self, model: str=None, wait=None):
+        """Take a key for a call to model
+
+        Args:
+            model (str): Model of the call, None for model-less calls.
+            wait (callable): Gets the seconds a call on a key would wait for
+                the upstream limits. Keys that wait least are taken first,
+                then the strategy decides.
+
+        Returns:
+            str: API key to use.
+
+        Raises:
+            ValueError: When no key of the pool serves the model.
+
+        """
+        eligible = self._eligible(model)
+        if not eligible:
+            raise ValueError(f"No upstream API key serves model {model}.")
+
+        if self.strategy == "remaining_quota":
+            def load(item):
+                remaining = item[1]["remaining_requests"]
+                return (-(remaining if remaining is not None
+                          else float("inf")), item[1]["in_flight"])
+        else:
+            def load(item):
+                return (item[1]["in_flight"], item[1]["requests"])
+
+        if wait is not None:
+            strategy_load = load
+
+            def load(item):
+                return (wait(item[0]),) + strategy_load(item)
+
+        api_key, state = min(eligible, key=load)
+        state["in_flight"] += 1
+        state["requests"] += 1
+        return api_key
+
+    def release(self, api_key: str):
+        """Give a key back after its call."""
+        state = self.keys.get(api_key)
+        if state is not None:
+            state["in_flight"] -= 1
+
+    def cooldown(self, api_key: str, retry_after: float=None):
+        """Stop using a key until retry_after seconds have passed."""
+        state = self.keys.get(api_key)
+        if state is None:
+            return
+        state["rate_limited"] += 1
+        state["cooldown_until"] = time.monotonic() + \
+            (retry_after if retry_after is not None else self.default_cooldown)
+
+    def update_from_headers(self, api_key: str, headers):
+        """Track rate-limit headers of an upstream response
+
+        Args:
+            api_key (str): Key of the call.
+            headers (Mapping): Response headers.
+
+        Returns:
+            None
+
+        """
+        state = self.keys.get(api_key)
+        if state is None:
+            return
+        for field in ("limit_requests", "limit_tokens",
+                      "remaining_requests", "remaining_tokens"):
+            value = headers.get(f"x-ratelimit-{field.replace('_', '-')}")
+            if value is not None:
+                try:
+                    state[field] = int(value)
+                except ValueError:
+                    pass
+        state["updated_at"] = time.time()
+
+    def stats(self):
+        """Get per-key statistics with masked keys."""
+        now = time.monotonic()
+        return {f"...{api_key[-4:]}": {
+                    "models": sorted(state["models"]) \
+                              if state["models"] else None,
+                    "in_flight": state["in_flight"],
+                    "requests": state["requests"],
+                    "rate_limited": state["rate_limited"],
+                    "cooling_down": state["cooldown_until"] > now,
+                    "remaining_requests": state["remaining_requests"],
+                    "remaining_tokens": state["remaining_tokens"]}
+                for api_key, state in self.keys.items()}
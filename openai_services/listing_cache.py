@@ -0,0 +1,128 @@
+"""This module caches file and fine-tune listings of openai."""
+import asyncio
+import time
+from collections import OrderedDict
+
+from logger.ve_logger import VeLogger
+from utils.http_utils import payload_hash
+
+
+class ListingCache:
+    """Stale-while-revalidate cache of listings.
+
+    A listing younger than ttl is served from the cache. An older one is
+    still served for up to stale_ttl more seconds while a background task
+    reloads it, and only a listing past both is loaded in the foreground.
+    Each cached listing carries an ETag of its content, so clients can
+    revalidate it with If-None-Match.
+
+    Attributes:
+        ttl (float): Seconds a listing is fresh.
+        stale_ttl (float): Seconds a listing is served stale after ttl.
+        max_entries (int): Max listings kept.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, ttl: float=10.0, stale_ttl: float=300.0,
+                 max_entries: int=1000) -> None:
+        """Initializer of class
+
+        Args:
+            ttl (float): Seconds a listing is fresh.
+            stale_ttl (float): Seconds a listing is served stale after ttl.
+            max_entries (int): Max listings kept.
+
+        Returns:
+            None
+
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._loading = {}
+        self._generations = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    async def get(self, key: str, fetch):
+        """Get a listing, loading it with fetch when needed
+
+        Args:
+            key (str): Key of the listing.
+            fetch (callable): Coroutine function loading the listing.
+
+        Returns:
+            tuple: The listing and the ETag of that same listing.
+
+        Raises:
+            Exception: Error of fetch when no usable listing is cached.
+
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry["fetched_at"]
+            if age < self.ttl:
+                self.hits += 1
+                return entry["value"], entry["etag"]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._load(key, fetch)
+                return entry["value"], entry["etag"]
+
+        self.misses += 1
+        entry = await asyncio.shield(self._load(key, fetch))
+        return entry["value"], entry["etag"]
+
+    def invalidate(self, *keys: str):
+        """Drop listings whose content changed upstream."""
+        for key in keys:
+            self.entries.pop(key, None)
+            self._loading.pop(key, None)
+            # Loads started before the change must not cache their result
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _load(self, key: str, fetch):
+        """Get the task loading a listing, starting it if needed."""
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._loading[key] = task
+            task.add_done_callback(lambda done: self._loaded(key, done))
+        return task
+
+    def _loaded(self, key: str, task):
+        """Forget a finished load, counting its error."""
+        if self._loading.get(key) is task:
+            self._loading.pop(key)
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+            self.logger.warning(f"Loading listing {key} failed with " \
+                                f"{task.exception()}")
+
+    async def _fetch(self, key: str, fetch):
+        """Load a listing and cache it unless it was invalidated meanwhile."""
+        generation = self._generations.get(key, 0)
+        value = await fetch()
+        entry = {"value": value,
+                 "etag": f'"{payload_hash(key, value)[:32]}"',
+                 "fetched_at": time.monotonic()}
+        if self._generations.get(key, 0) == generation:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        """Get cache statistics."""
+        return {"entries": len(self.entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refresh_errors": self.refresh_errors}
@@ -0,0 +1,177 @@
+"""This module meters token usage and spend of requests."""
+from openai_services.passthrough import RawResponse
+from logger.ve_logger import VeLogger
+
+
+# Prices in dollars per 1K (prompt, completion) tokens
+MODEL_PRICE_DICT = {
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo-16k": (0.003, 0.004),
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "text-davinci-003": (0.02, 0.02),
+    "text-davinci-002": (0.02, 0.02),
+    "code-davinci-002": (0.02, 0.02),
+    "text-embedding-ada-002": (0.0004, 0.0004),
+}
+
+
+class Metering:
+    """Measure tokens and spend of upstream responses.
+
+    Token counts are taken from the `usage` field of responses. Streams carry
+    no usage, so their prompt and completion are counted locally.
+
+    Attributes:
+        tokenizer (Tokenizer): Tokenizer used for streams.
+        price_dict (dict): Prices per 1K prompt and completion tokens keyed
+            by model.
+        default_price (float): Price per 1K tokens of models missing from
+            price_dict.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, tokenizer, price_dict: dict=None,
+                 default_price: float=0.12) -> None:
+        """Initializer of class
+
+        Args:
+            tokenizer (Tokenizer): Tokenizer used for streams.
+            price_dict (dict): Prices per 1K prompt and completion tokens
+                keyed by model.
+            default_price (float): Price per 1K tokens of unknown models.
+
+        Returns:
+            None
+
+        """
+        self.tokenizer = tokenizer
+        self.price_dict = MODEL_PRICE_DICT if price_dict is None \
+                          else price_dict
+        self.default_price = default_price
+        self.unpriced_models = set()
+
+    def prices(self, model: str):
+        """Get the prices of a model
+
+        Dated model versions use the prices of their longest base model,
+        e.g. `gpt-4-0613` is priced as `gpt-4` and `gpt-4-32k-0613` as
+        `gpt-4-32k`. Unknown models are charged default_price, so spend
+        budgets still bind for them.
+
+        Args:
+            model (str): Model name.
+
+        Returns:
+            tuple: dollars per 1K prompt and completion tokens.
+
+        """
+        prices = self.price_dict.get(model)
+        if prices is None:
+            base_models = [base_model for base_model in self.price_dict
+                           if model and model.startswith(base_model)]
+            if base_models:
+                prices = self.price_dict[max(base_models, key=len)]
+        if prices is None:
+            if model not in self.unpriced_models:
+                self.unpriced_models.add(model)
+                self.logger.warning(f"Model {model} has no price, charging " \
+                                    f"{self.default_price} per 1K tokens.")
+            prices = (self.default_price, self.default_price)
+        return prices
+
+    def price(self, model: str, prompt_tokens: int,
+              completion_tokens: int=0):
+        """Price tokens of a model
+
+        Args:
+            model (str): Model name.
+            prompt_tokens (int): Number of prompt tokens.
+            completion_tokens (int): Number of completion tokens.
+
+        Returns:
+            float: spend in dollars.
+
+        """
+        prompt_price, completion_price = self.prices(model)
+        return (prompt_price * prompt_tokens +
+                completion_price * completion_tokens) / 1000
+
+    def _usage(self, model: str, prompt_tokens: int, completion_tokens: int):
+        """Build a usage record."""
+        return {"prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "spend": self.price(model, prompt_tokens, completion_tokens)}
+
+    def measure(self, model: str, openai_result):
+        """Get usage of a response
+
+        Args:
+            model (str): Requested model.
+            openai_result (dict or RawResponse): Response of openai.
+
+        Returns:
+            dict: tokens and spend, None if the response has no usage.
+
+        """
+        if isinstance(openai_result, RawResponse):
+            usage = openai_result.usage
+        else:
+            usage = openai_result.get("usage") \
+                    if isinstance(openai_result, dict) else None
+        if not usage:
+            return None
+        return self._usage(model, usage.get("prompt_tokens", 0),
+                           usage.get("completion_tokens", 0))
+
+    def prompt_tokens(self, payload: dict):
+        """Count prompt tokens of a completion or chat payload."""
+        model = payload.get("model")
+        if payload.get("messages") is not None:
+            return self.tokenizer.count_messages(payload["messages"], model)
+
+        prompt = payload.get("prompt")
+        if prompt is None:
+            return 0
+        if isinstance(prompt, str):
+            return self.tokenizer.count(prompt, model)
+        # A list of token ids or a list of prompts
+        if prompt and isinstance(prompt[0], int):
+            return len(prompt)
+        return sum(len(item) if isinstance(item, list) else
+                   self.tokenizer.count(item, model) for item in prompt)
+
+    def measure_stream(self, payload: dict, completion: str):
+        """Get usage of a stream by counting tokens locally
+
+        Args:
+            payload (dict): Request payload.
+            completion (str): Concatenated text of the streamed chunks.
+
+        Returns:
+            dict: tokens and spend.
+
+        """
+        model = payload.get("model")
+        return self._usage(model, self.prompt_tokens(payload),
+                           self.tokenizer.count(completion, model))
+
+    async def ameasure_stream(self, payload: dict, completion: str):
+        """Get usage of a stream, counting tokens on the tokenizer pool."""
+        return await self.tokenizer.run(self.measure_stream, payload,
+                                        completion)
+
+    @staticmethod
+    def chunk_text(chunk: dict):
+        """Get generated text of a streamed chunk."""
+        texts = []
+        for choice in chunk.get("choices", []):
+            if "delta" in choice:
+                texts.append(choice["delta"].get("content") or "")
+            else:
+                texts.append(choice.get("text") or "")
+        return "".join(texts)
@@ -0,0 +1,183 @@
+"""This module keeps the catalog of openai models."""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import openai
+
+from logger.ve_logger import VeLogger
+
+
+class ModelCatalog:
+    """Catalog of available models with per-model metadata.
+
+    The catalog is loaded from an on-disk snapshot when one exists and
+    refreshed from openai in the background every ttl seconds, so neither
+    startup nor model validation waits on the network. A model missing from
+    the catalog triggers a refresh at most every miss_refresh_interval
+    seconds, so fine-tuned models are known as soon as they are listed.
+
+    Attributes:
+        snapshot_path (str): Path of the JSON snapshot, None disables it.
+        ttl (float): Seconds after which the catalog is refreshed.
+        miss_refresh_interval (float): Min seconds between two refreshes
+            caused by unknown models.
+        models (dict): Metadata of each model keyed by model id.
+        updated_at (float): Unix time of the last successful load.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, snapshot_path: str=None, ttl: float=3600.0,
+                 list_models=None,
+                 miss_refresh_interval: float=60.0) -> None:
+        """Initializer of class
+
+        Args:
+            snapshot_path (str): Path of the JSON snapshot.
+            ttl (float): Seconds after which the catalog is refreshed.
+            list_models (callable): Coroutine function listing models,
+                openai.Model.alist by default.
+            miss_refresh_interval (float): Min seconds between two
+                refreshes caused by unknown models.
+
+        Returns:
+            None
+
+        """
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.list_models = list_models or openai.Model.alist
+        self.miss_refresh_interval = miss_refresh_interval
+        self.models = {}
+        self.updated_at = 0.0
+        self._task = None
+        self._refresh_lock = asyncio.Lock()
+        self._miss_refreshed_at = 0.0
+        self._load_snapshot()
+
+    def __contains__(self, model: str):
+        return model in self.models
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, model: str):
+        """Get metadata of a model, None if it is unknown."""
+        return self.models.get(model)
+
+    async def has_model(self, model: str):
+        """Whether a model is available
+
+        An empty catalog, before the first load, knows no model and
+        accepts all of them.
+
+        Args:
+            model (str): Model id.
+
+        Returns:
+            bool: False if the model is missing even after a refresh.
+
+        """
+        if model in self.models or not self.models:
+            return True
+        async with self._refresh_lock:
+            if model in self.models:
+                return True
+            if time.monotonic() - self._miss_refreshed_at < \
+                    self.miss_refresh_interval:
+                return False
+            self._miss_refreshed_at = time.monotonic()
+            try:
+                await self.refresh()
+            except Exception as exception:
+                self.logger.warning(f"Refreshing models failed with " \
+                                    f"{exception}")
+                return True
+        return model in self.models
+
+    def _load_snapshot(self):
+        """Load the catalog from the on-disk snapshot."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf8") as file:
+                snapshot = json.load(file)
+            self.models = snapshot["models"]
+            self.updated_at = snapshot["updated_at"]
+        except (OSError, ValueError, KeyError) as exception:
+            self.logger.warning(f"Loading model snapshot failed with " \
+                                f"{exception}")
+
+    def _save_snapshot(self):
+        """Write the catalog to the on-disk snapshot."""
+        if not self.snapshot_path:
+            return
+        try:
+            # A temporary file of its own, workers may save at the same time
+            with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf8", delete=False,
+                    dir=os.path.dirname(os.path.abspath(self.snapshot_path)),
+                    prefix=f"{os.path.basename(self.snapshot_path)}.",
+                    suffix=".tmp") as file:
+                json.dump({"models": self.models,
+                           "updated_at": self.updated_at}, file)
+            try:
+                os.replace(file.name, self.snapshot_path)
+            except OSError:
+                os.unlink(file.name)
+                raise
+        except OSError as exception:
+            self.logger.warning(f"Saving model snapshot failed with " \
+                                f"{exception}")
+
+    async def refresh(self):
+        """Reload the catalog from openai."""
+        model_list_raw = await self.list_models()
+        self.models = {
+            model_dict['id']: {
+                "owned_by": model_dict.get('owned_by'),
+                "created": model_dict.get('created'),
+            }
+            for model_dict in model_list_raw.data
+        }
+        self.updated_at = time.time()
+        await asyncio.to_thread(self._save_snapshot)
+
+    async def _run(self):
+        """Refresh the catalog whenever it is older than ttl."""
+        while True:
+            delay = self.updated_at + self.ttl - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as exception:
+                self.logger.error(f"Refreshing models failed with {exception}")
+                await asyncio.sleep(min(self.ttl, 60))
+
+    def start(self):
+        """Start the background refresh task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        """Get catalog statistics."""
+        return {"models": len(self.models),
+                "age": time.time() - self.updated_at \
+                       if self.updated_at else None}
@@ -1,17 +1,47 @@
 """This module handles openai requests."""
+import asyncio
+import io
+import json
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+
+import aiohttp
 import openai
-import tiktoken
+from openai.openai_object import OpenAIObject
 
 from configs.openai_config import OpenAIConfig
+from openai_services.model_catalog import ModelCatalog
+from openai_services.embedding_cache import EmbeddingCache
+from openai_services.embedding_batcher import EmbeddingBatcher
+from openai_services.response_cache import ResponseCache
+from openai_services.single_flight import SingleFlight
+from openai_services.tokenizer import Tokenizer
+from openai_services.metering import Metering, MODEL_PRICE_DICT
+from openai_services.http_transport import HttpTransport
+from openai_services.key_pool import KeyPool
+from openai_services.resilience import CircuitBreaker, RetryPolicy
+from openai_services.scheduler import FairScheduler
+from openai_services.admission import AdmissionController, estimate_tokens
+from openai_services.file_upload import validate_jsonl, file_chunks
+from openai_services.listing_cache import ListingCache
+from openai_services.passthrough import RawResponse
+from utils.http_utils import retry_after_seconds
+from utils.http_utils import payload_hash
 from logger.ve_logger import VeLogger
 
 
-MODEL_PRICE_DICT = {
-    "gpt-3.5-turbo": 0.002,
-    "text-davinci-003": 0.02,
-    "text-davinci-002": 0.02,
-    "code-davinci-002": 0.02,
-}
+# Resources accepting a (connect, total) request_timeout
+ENGINE_RESOURCES = (openai.Completion, openai.ChatCompletion, openai.Embedding)
+
+# File and fine-tune methods that must not run twice
+UNSAFE_METHODS = ("acreate", "acancel")
+
+# Model of the upstream call running in the current context
+upstream_model = ContextVar("upstream_model", default=None)
+
+# User whose fair share the upstream calls of the current context take
+upstream_user = ContextVar("upstream_user", default=None)
 
 
 class OpenAIService:
@@ -20,11 +50,14 @@ class OpenAIService:
     # Initialize logger
     logger = VeLogger()
 
-    def __init__(self, openai_config: OpenAIConfig=None) -> None:
+    def __init__(self, openai_config: OpenAIConfig=None,
+                 workers: int=1) -> None:
         """Intializer method of the class
         
         Args:
             openai_config (OpenAIConfig): Neccessary configs for openai api.
+            workers (int): Worker processes calling the same API keys, which
+                split the upstream limits between them.
             
         Returns:
             None
@@ -35,81 +68,535 @@ class OpenAIService:
             self.logger.error("openai config is None.")
             raise ValueError("Provide openai_config when initializing class.")
 
-        if openai_config.openai_api_key is None:
+        if openai_config.openai_api_key is None and \
+                not openai_config.openai_api_keys:
             self.logger.error("OpenAI API key is None.")
             raise ValueError(
                 "Provide OpenAI API key when initializing class. You can set the " \
                 "enviroment variable `OPENAI_API_KEY` to your OpeAI API key.")
 
-        openai.api_key = openai_config.openai_api_key
-        self.model_list = self._get_models(openai.Model.list())
+        api_keys = openai_config.openai_api_keys or \
+                   [openai_config.openai_api_key]
+        openai.api_key = openai_config.openai_api_key or \
+                         api_keys[0].partition(":")[0]
+        self.key_pool = KeyPool(
+            api_keys=api_keys,
+            strategy=openai_config.key_pool_strategy,
+            default_cooldown=openai_config.key_pool_cooldown)
+        self.transport = HttpTransport(
+            max_connections=openai_config.http_max_connections,
+            max_connections_per_host=\
+                openai_config.http_max_connections_per_host,
+            keepalive_timeout=openai_config.http_keepalive_timeout,
+            connect_timeout=openai_config.http_connect_timeout,
+            read_timeout=openai_config.http_read_timeout)
+        self.transport.add_response_listener(self._track_rate_limits)
+        self.retry_policy = RetryPolicy(
+            max_retries=openai_config.retry_max_retries,
+            base_delay=openai_config.retry_base_delay,
+            max_delay=openai_config.retry_max_delay,
+            max_retry_after=openai_config.retry_max_retry_after,
+            breaker=CircuitBreaker(
+                failure_threshold=openai_config.breaker_failure_threshold,
+                recovery_timeout=openai_config.breaker_recovery_timeout,
+                half_open_calls=openai_config.breaker_half_open_calls))
+        self.admission = None
+        if openai_config.admission:
+            self.admission = AdmissionController(
+                max_wait=openai_config.admission_max_wait,
+                default_rpm=openai_config.admission_default_rpm,
+                default_tpm=openai_config.admission_default_tpm,
+                share=1 / workers)
+        self.scheduler = None
+        if openai_config.scheduler_max_in_flight:
+            if openai_config.scheduler_max_in_flight < workers:
+                self.logger.error("Scheduler max in flight below workers.")
+                raise ValueError(
+                    "Set `OPENAI_SCHEDULER_MAX_IN_FLIGHT` to at least the " \
+                    f"{workers} workers, each runs its share of the calls.")
+            self.scheduler = FairScheduler(
+                max_in_flight=openai_config.scheduler_max_in_flight // workers,
+                default_weight=openai_config.scheduler_default_weight,
+                default_max_concurrency=\
+                    openai_config.scheduler_default_max_concurrency,
+                max_wait=openai_config.scheduler_max_wait,
+                max_queue=openai_config.scheduler_max_queue)
+        self.model_catalog = ModelCatalog(
+            snapshot_path=openai_config.model_snapshot_path,
+            ttl=openai_config.model_catalog_ttl,
+            list_models=partial(self._upstream, openai.Model.alist))
+        self.embedding_cache = None
+        if openai_config.embedding_cache:
+            self.embedding_cache = EmbeddingCache(
+                max_memory_entries=openai_config.embedding_cache_size,
+                ttl=openai_config.embedding_cache_ttl,
+                disk_path=openai_config.embedding_cache_path,
+                max_disk_entries=openai_config.embedding_cache_disk_size)
+        self.embedding_batcher = None
+        if openai_config.embedding_batch:
+            self.embedding_batcher = EmbeddingBatcher(
+                create=partial(self._upstream, openai.Embedding.acreate),
+                window=openai_config.embedding_batch_window,
+                max_batch_inputs=openai_config.embedding_batch_max_inputs,
+                max_request_inputs=\
+                    openai_config.embedding_batch_max_request_inputs)
+        self.response_cache = None
+        if openai_config.response_cache:
+            self.response_cache = ResponseCache(
+                max_size=openai_config.response_cache_size,
+                ttl=openai_config.response_cache_ttl)
+        self.listing_cache = None
+        if openai_config.listing_cache:
+            self.listing_cache = ListingCache(
+                ttl=openai_config.listing_cache_ttl,
+                stale_ttl=openai_config.listing_cache_stale_ttl)
+        self.single_flight = SingleFlight() \
+                             if openai_config.single_flight else None
+        self.passthrough = openai_config.passthrough
+        self.tokenizer = Tokenizer(
+            threads=openai_config.tokenizer_threads,
+            batch_threshold=openai_config.tokenizer_batch_threshold)
+        self.tokenizer_warm_models = openai_config.tokenizer_warm_models
+        self.metering = Metering(
+            self.tokenizer, MODEL_PRICE_DICT,
+            default_price=openai_config.metering_default_price)
+        self.upload_buffer_size = openai_config.upload_buffer_size
+        self.upload_validate_jsonl = openai_config.upload_validate_jsonl
+
+    async def start(self):
+        """Start background tasks of the service."""
+        self.transport.start()
+        self.model_catalog.start()
+        await asyncio.to_thread(self.tokenizer.warm,
+                                self.tokenizer_warm_models)
+
+    async def close(self):
+        """Stop background tasks of the service."""
+        await self.model_catalog.stop()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.tokenizer.close()
+        await self.transport.close()
+
+    async def count_tokens(self, model: str, prompt=None,
+                           messages: list=None):
+        """Count tokens locally without calling openai.
 
-    def _get_models(self, model_list_raw: list):
-        """Get models
-        
         Args:
-            model_list_raw (list): list of models obtained from openai.
-        
+            model (str): Model whose tokenizer is used.
+            prompt (str or list): Prompt or list of prompts.
+            messages (list): Chat messages.
+
         Returns:
-            list: lists of openai models (completion, chat, similarity)
+            dict: token count of each prompt and the total, including the
+                chat format overhead of messages.
+
+        """
+        result = {"model": model, "total_tokens": 0}
+        if prompt is not None:
+            prompts = [prompt] if isinstance(prompt, str) else prompt
+            counts = await self.tokenizer.acount_texts(prompts, model)
+            result["prompt_tokens"] = counts
+            result["total_tokens"] += sum(counts)
+        if messages is not None:
+            count = await self.tokenizer.acount_messages(messages, model)
+            result["messages_tokens"] = count
+            result["total_tokens"] += count
+        return result
+
+    def _track_rate_limits(self, request_headers, response):
+        """Update key pool and admission limits from an upstream response."""
+        authorization = request_headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            return
+        api_key = authorization[7:]
+        self.key_pool.update_from_headers(api_key, response.headers)
+        model = upstream_model.get()
+        if self.admission is not None and model is not None:
+            self.admission.update_from_headers(api_key, model,
+                                               response.headers)
+
+    async def acquire_slot(self, user_info: dict):
+        """Wait for a fair share of upstream capacity
+
+        Args:
+            user_info (dict): Data of the requesting user, its `weight` and
+                `max_concurrency` set its share.
+
+        Returns:
+            None
+
+        Raises:
+            CapacityError: When no slot is free in time.
+
+        """
+        if self.scheduler is not None:
+            await self.scheduler.acquire(
+                user_info['user_id'], weight=user_info.get('weight'),
+                max_concurrency=user_info.get('max_concurrency'))
+
+    def release_slot(self, user_info: dict):
+        """Give the upstream slot of a finished call back"""
+        if self.scheduler is not None:
+            self.scheduler.release(user_info['user_id'])
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold an upstream slot of the user of the current context.
+
+        Calls without a user, e.g. background refreshes, take no slot.
+        """
+        user_info = upstream_user.get()
+        if user_info is None:
+            yield
+            return
+        await self.acquire_slot(user_info)
+        try:
+            yield
+        finally:
+            self.release_slot(user_info)
+
+    async def _upstream(self, create, *args, raw: bool=False, **kwargs):
+        """Make an upstream call on the shared HTTP transport.
+
+        Every call to openai goes through this method. Failed calls are
+        retried and calls to an unhealthy model fail fast through the retry
+        policy. Other coroutine functions are awaited as they are. A raw
+        completion, chat or embedding call returns the response body as
+        received instead of an OpenAIObject. Completion, chat and embedding
+        calls take an upstream slot of the requesting user for their
+        duration, except streams whose slot is held by the caller until
+        the stream ends.
+        """
+        resource = getattr(create, "__self__", None)
+        if not (isinstance(resource, type) and
+                issubclass(resource, OpenAIObject)):
+            return await create(*args, **kwargs)
+
+        self.transport.bind()
+        idempotent = resource in ENGINE_RESOURCES or \
+                     create.__name__ not in UNSAFE_METHODS
+        if resource in ENGINE_RESOURCES:
+            if raw and not args:
+                create = partial(self._create_raw, resource)
+            else:
+                kwargs.setdefault("request_timeout",
+                                  self.transport.request_timeout)
+        call = partial(
+            self.retry_policy.call,
+            circuit=kwargs.get("model") or resource.__name__,
+            attempt=partial(self._attempt, resource, create, *args, **kwargs),
+            idempotent=idempotent)
+        if resource not in ENGINE_RESOURCES or kwargs.get("stream"):
+            return await call()
+        async with self._slot():
+            return await call()
+
+    async def _attempt(self, resource, create, *args, **kwargs):
+        """Make one upstream call attempt.
+
+        Completion, chat and embedding calls take a key of the key pool and
+        wait for the admission controller, while file and fine-tune calls
+        keep the primary key so they all see the same organization.
+        """
+        if resource not in ENGINE_RESOURCES or "api_key" in kwargs:
+            return await create(*args, **kwargs)
+
+        model = kwargs.get("model")
+        tokens = estimate_tokens(kwargs)
+        wait = None
+        if self.admission is not None:
+            # Prefer a key whose limits let the call go soonest
+            wait = partial(self.admission.wait_time, model=model,
+                           tokens=tokens)
+        api_key = self.key_pool.acquire(model, wait=wait)
+        context_token = upstream_model.set(model)
+        try:
+            if self.admission is not None:
+                await self.admission.admit(api_key, model, tokens)
+            return await create(*args, api_key=api_key, **kwargs)
+        except openai.error.RateLimitError as exception:
+            self.key_pool.cooldown(
+                api_key, retry_after_seconds(exception.headers))
+            raise
+        finally:
+            upstream_model.reset(context_token)
+            self.key_pool.release(api_key)
+
+    async def _create_raw(self, resource, api_key: str=None, **params):
+        """Post an engine call on the shared session and keep its body.
+
+        Error responses are raised as the openai errors the client would
+        raise, so retries and key cooldowns work as for other calls.
+        """
+        headers = {"Authorization": f"Bearer {api_key or openai.api_key}"}
+        if openai.organization:
+            headers["OpenAI-Organization"] = openai.organization
+
+        session = self.transport.session
+        if session is None:
+            raise openai.error.APIConnectionError(
+                "HTTP transport is not started.")
+        try:
+            async with session.post(
+                    f"{openai.api_base}{resource.class_url()}",
+                    json=params, headers=headers) as response:
+                body = await response.read()
+        except asyncio.TimeoutError as exception:
+            raise openai.error.Timeout("Request timed out") from exception
+        except aiohttp.ClientError as exception:
+            raise openai.error.APIConnectionError(
+                f"Error communicating with OpenAI: {exception}") \
+                from exception
 
+        if not 200 <= response.status < 300:
+            openai.api_requestor.APIRequestor()._interpret_response_line(
+                body.decode("utf-8", "replace"), response.status,
+                response.headers, stream=False)
+        return RawResponse(body, response.status, response.headers)
+
+    async def _shared(self, endpoint: str, create, *args, raw: bool=False,
+                      **kwargs):
+        """Share one upstream call between identical in-flight requests."""
+        if self.single_flight is None:
+            return await self._upstream(create, *args, raw=raw, **kwargs)
+        key = payload_hash(endpoint, {"args": args, "kwargs": kwargs})
+        return await self.single_flight.do(key, self._upstream, create,
+                                           *args, raw=raw, **kwargs)
+
+    async def _cached(self, endpoint: str, create, use_cache: bool,
+                      **kwargs):
+        """Serve deterministic requests from the response cache.
+
+        Identical deterministic requests in flight share one upstream call
+        unless the caller opted out with use_cache. Other requests must get
+        their own sample, so they are never shared. Streams are neither
+        shared nor passed through raw.
         """
-        model_list = []
-        for model_dict in model_list_raw.data:
-            model_list.append(model_dict['id'])
+        if kwargs.get("stream"):
+            return await self._upstream(create, **kwargs)
+        raw = self.passthrough
+        if not use_cache or not ResponseCache.cacheable(kwargs):
+            return await self._upstream(create, raw=raw, **kwargs)
+
+        if self.response_cache is None:
+            return await self._shared(endpoint, create, raw=raw, **kwargs)
+
+        openai_result = self.response_cache.get(endpoint, kwargs)
+        if openai_result is None:
+            openai_result = await self._shared(endpoint, create, raw=raw,
+                                               **kwargs)
+            self.response_cache.set(endpoint, kwargs, openai_result)
+        return openai_result
 
-        return model_list
+    @staticmethod
+    def _listing_key(endpoint: str, id: str=None):
+        """Key of a listing in the listing cache."""
+        return endpoint if id is None else f"{endpoint}:{id}"
 
-    def _validate_model(self, model: str):
-        """Validate model name"""
-        if model in self.model_list:
-            return True
-        return False
+    async def _listing(self, endpoint: str, create, **kwargs):
+        """Serve file and fine-tune listings from the listing cache.
 
-    def _count_tokens(self, text: str, model: str):
-        """Count tokens."""
-        if self._validate_model(model):
-            tokenizer = tiktoken.encoding_for_model(model)
-            return len(tokenizer.encode(text))
+        The listing comes with its ETag, None without the listing cache.
+        """
+        fetch = partial(self._shared, endpoint, create, **kwargs)
+        if self.listing_cache is None:
+            return await fetch(), None
+        return await self.listing_cache.get(
+            self._listing_key(endpoint, kwargs.get("id")), fetch)
+
+    def _invalidate_listings(self, *keys):
+        """Drop cached listings changed by an upstream call."""
+        if self.listing_cache is not None:
+            self.listing_cache.invalidate(*keys)
 
-    def completions(self, *args, **kwargs):
+    async def completions(self, *args, use_cache: bool=True, **kwargs):
         """Completion models method"""
-        return openai.Completion.create(*args, **kwargs)
+        if args:
+            return await self._upstream(openai.Completion.acreate, *args,
+                                      **kwargs)
+        return await self._cached("completions", openai.Completion.acreate,
+                                  use_cache, **kwargs)
 
-    def chat_completions(self, *args, **kwargs):
+    async def chat_completions(self, *args, use_cache: bool=True, **kwargs):
         """Chat Completion models method"""
-        return openai.ChatCompletion.create(*args, **kwargs)
+        if args:
+            return await self._upstream(openai.ChatCompletion.acreate, *args,
+                                      **kwargs)
+        return await self._cached("chat_completions",
+                                  openai.ChatCompletion.acreate,
+                                  use_cache, **kwargs)
 
-    def embeddings(self, *args, **kwargs):
+    async def embeddings(self, *args, **kwargs):
         """Embedding Completion models method"""
-        return openai.Embedding.create(*args, **kwargs)
+        return await self._shared("embeddings", self._embeddings,
+                                  *args, **kwargs)
+
+    async def _embeddings(self, *args, **kwargs):
+        """Get embeddings through the embedding cache and batcher
+
+        String inputs are served from the embedding cache where possible.
+        Small requests are coalesced with concurrent ones by the embedding
+        batcher, larger ones send only their missing strings upstream. The
+        usage of string inputs is counted locally per input, duplicates and
+        cache hits included, so a request costs the same on every path.
+        """
+        texts = kwargs.get("input")
+        if isinstance(texts, str):
+            texts = [texts]
+        if args or not texts \
+                or not all(isinstance(text, str) for text in texts):
+            return await self._upstream(openai.Embedding.acreate, *args,
+                                      raw=self.passthrough, **kwargs)
 
-    def upload_files(self, *args, **kwargs):
+        model = kwargs.get("model")
+        if self.embedding_cache is not None:
+            vectors = await self.embedding_cache.get_many(model, texts)
+        else:
+            vectors = [None] * len(texts)
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(texts, vectors) if vector is None))
+
+        if missing:
+            if self.embedding_batcher is not None and \
+                    self.embedding_batcher.accepts(missing) and \
+                    set(kwargs) <= {"model", "input", "user"}:
+                missing_vectors = await self.embedding_batcher.embed(
+                    model, missing, user=kwargs.get("user"))
+            elif len(missing) == len(set(texts)) and \
+                    (self.passthrough or self.embedding_cache is None):
+                # Nothing to merge, the upstream response is final
+                openai_result = await self._upstream(
+                    openai.Embedding.acreate, raw=self.passthrough, **kwargs)
+                if self.embedding_cache is not None:
+                    # Parsed only to fill the cache, the body is forwarded
+                    result = await asyncio.to_thread(json.loads,
+                                                     openai_result.body)
+                    found = {texts[item["index"]]: item["embedding"]
+                             for item in result["data"]}
+                    await self.embedding_cache.set_many(
+                        model, list(found), list(found.values()))
+                usage = await self._embedding_usage(texts, model)
+                if isinstance(openai_result, RawResponse):
+                    openai_result.usage = usage
+                else:
+                    openai_result["usage"] = usage
+                return openai_result
+            else:
+                openai_result = await self._upstream(
+                    openai.Embedding.acreate, **{**kwargs, "input": missing})
+                missing_vectors = [item["embedding"] for item in sorted(
+                    openai_result["data"], key=lambda item: item["index"])]
+
+            if self.embedding_cache is not None:
+                await self.embedding_cache.set_many(model, missing,
+                                                    missing_vectors)
+            found = dict(zip(missing, missing_vectors))
+            vectors = [found[text] if vector is None else vector
+                       for text, vector in zip(texts, vectors)]
+
+        return {
+            "object": "list",
+            "data": [{"object": "embedding", "index": index,
+                      "embedding": vector}
+                     for index, vector in enumerate(vectors)],
+            "model": model,
+            "usage": await self._embedding_usage(texts, model)
+        }
+
+    async def _embedding_usage(self, texts: list, model: str):
+        """Count the usage of embedding inputs locally."""
+        tokens = sum(await self.tokenizer.acount_texts(texts, model))
+        return {"prompt_tokens": tokens, "total_tokens": tokens}
+
+    async def upload_files(self, file, purpose: str="fine-tune",
+                           user_provided_filename: str=None):
         """Upload file.
-        
+
+        The file is validated as JSONL, then streamed upstream in chunks of
+        upload_buffer_size bytes, so it is never held in memory whole.
+
         Args:
-            file (any): File to upload.
+            file (BinaryIO or bytes): File to upload.
             purpose (str): Purpose for file (Default: 'fine-tune').
-        
+            user_provided_filename (str): Name of the file.
+
         Returns:
             dict: Response from OpenAI
 
+        Raises:
+            ValueError: When the file is not valid JSONL.
+
+        """
+        if isinstance(file, (bytes, bytearray)):
+            file = io.BytesIO(file)
+        if self.upload_validate_jsonl:
+            await asyncio.to_thread(validate_jsonl, file,
+                                    self.upload_buffer_size)
+        try:
+            return await self.retry_policy.call(
+                circuit=openai.File.__name__,
+                attempt=partial(self._stream_file, file, purpose,
+                                user_provided_filename),
+                idempotent=False)
+        finally:
+            self._invalidate_listings("list_files")
+
+    async def _stream_file(self, file, purpose: str, filename: str=None):
+        """Send a multipart upload of a file without buffering it.
+
+        The openai client encodes the whole multipart body in memory, so the
+        upload is posted on the shared session and only its response is
+        handled by the client.
         """
-        return openai.File.create(*args, **kwargs)
+        await asyncio.to_thread(file.seek, 0)
+        form = aiohttp.FormData()
+        form.add_field("purpose", purpose)
+        form.add_field("file", file_chunks(file, self.upload_buffer_size),
+                       filename=filename or "file",
+                       content_type="application/octet-stream")
+        headers = {"Authorization": f"Bearer {openai.api_key}"}
+        if openai.organization:
+            headers["OpenAI-Organization"] = openai.organization
 
-    def list_files(self):
+        session = self.transport.session
+        if session is None:
+            raise openai.error.APIConnectionError(
+                "HTTP transport is not started.")
+        try:
+            async with session.post(
+                    f"{openai.api_base}/files", data=form, headers=headers,
+                    timeout=aiohttp.ClientTimeout(
+                        total=None, connect=self.transport.connect_timeout,
+                        sock_read=self.transport.read_timeout)) as response:
+                body = await response.text()
+        except asyncio.TimeoutError as exception:
+            raise openai.error.Timeout("Request timed out") from exception
+        except aiohttp.ClientError as exception:
+            raise openai.error.APIConnectionError(
+                f"Error communicating with OpenAI: {exception}") \
+                from exception
+
+        openai_response = openai.api_requestor.APIRequestor() \
+            ._interpret_response_line(body, response.status,
+                                      response.headers, stream=False)
+        return openai.util.convert_to_openai_object(
+            openai_response, openai.api_key, None, openai.organization)
+
+    async def list_files(self):
         """Get the list of uploaded files.
         
         Args:
             None
 
         Returns:
-            dict: Response from OpenAI
+            tuple: Response from OpenAI and its ETag, None if listings are
+                not cached.
         
         """
-        return openai.File.list()
+        return await self._listing("list_files", openai.File.alist)
 
-    def fine_tunes(self, *args, **kwargs):
+    async def fine_tunes(self, *args, **kwargs):
         """Finetune model via uploaded file.
         
         Args:
@@ -119,21 +606,43 @@ class OpenAIService:
             dict: Response from OpenAI
         
         """
-        return openai.FineTune.create(*args, **kwargs)
+        try:
+            return await self._upstream(openai.FineTune.acreate, *args,
+                                        **kwargs)
+        finally:
+            self._invalidate_listings("list_fine_tunes")
 
-    def retrieve_fine_tune(self, id: str):
+    async def retrieve_fine_tune(self, id: str):
         """Get the details of a finetuned model.
         
         Args:
             id (str): id of the fine-tuning process.
 
         Returns:
-            dict: Response from OpenAI
+            tuple: Response from OpenAI and its ETag, None if listings are
+                not cached.
         
         """
-        return openai.FineTune.retrieve(id=id)
+        return await self._listing("retrieve_fine_tune",
+                                   openai.FineTune.aretrieve, id=id)
+
+    async def poll_fine_tune(self, id: str):
+        """Get the current details of a finetuned model.
 
-    def cancel_fine_tune(self, id: str):
+        Unlike retrieve_fine_tune, the listing cache is bypassed.
+
+        Args:
+            id (str): id of the fine-tuning process.
+
+        Returns:
+            dict: Response from OpenAI as plain dicts and lists.
+
+        """
+        openai_result = await self._shared("retrieve_fine_tune",
+                                           openai.FineTune.aretrieve, id=id)
+        return openai_result.to_dict_recursive()
+
+    async def cancel_fine_tune(self, id: str):
         """Cancel a finetune process.
         
         Args:
@@ -143,16 +652,21 @@ class OpenAIService:
             dict: Response from OpenAI
         
         """
-        return openai.FineTune.cancel(id=id)
+        try:
+            return await self._upstream(openai.FineTune.acancel, id=id)
+        finally:
+            self._invalidate_listings(
+                "list_fine_tunes", self._listing_key("retrieve_fine_tune", id))
 
-    def list_fine_tunes(self):
+    async def list_fine_tunes(self):
         """Get the list of finetuned models.
         
         Args:
             None
 
         Returns:
-            dict: Response from OpenAI
+            tuple: Response from OpenAI and its ETag, None if listings are
+                not cached.
         
         """
-        return openai.FineTune.list()
+        return await self._listing("list_fine_tunes", openai.FineTune.alist)
@@ -0,0 +1,83 @@
+"""This module forwards upstream response bodies without re-serializing."""
+import json
+
+
+# Upstream headers worth forwarding to clients
+FORWARDED_HEADERS = ("openai-model", "openai-processing-ms", "openai-version",
+                     "x-request-id")
+
+_decoder = json.JSONDecoder()
+
+
+def extract_usage(body: bytes):
+    """Get the usage object of a JSON response body without parsing it all
+
+    openai puts `usage` after the data of a response, so only the fragment
+    after its last key is decoded. A body whose last `"usage"` is not a key,
+    e.g. inside generated text, is parsed whole.
+
+    Args:
+        body (bytes): JSON body of an upstream response.
+
+    Returns:
+        dict: The usage object, None if the body has none.
+
+    """
+    start = body.rfind(b'"usage"')
+    if start > 0 and body[start - 1:start] != b"\\":
+        colon = body.find(b":", start + 7)
+        if colon != -1 and not body[start + 7:colon].strip():
+            try:
+                usage, _ = _decoder.raw_decode(
+                    body[colon + 1:].decode().lstrip())
+            except ValueError:
+                usage = None
+            if isinstance(usage, dict):
+                return usage
+
+    try:
+        result = json.loads(body)
+    except ValueError:
+        return None
+    return result.get("usage") if isinstance(result, dict) else None
+
+
+class RawResponse:
+    """Body, status and headers of an upstream response as received.
+
+    Attributes:
+        body (bytes): JSON body of the response.
+        status (int): HTTP status of the response.
+        headers (dict): Upstream headers forwarded to the client.
+
+    """
+
+    def __init__(self, body: bytes, status: int=200, headers=None) -> None:
+        """Initializer of class
+
+        Args:
+            body (bytes): JSON body of the response.
+            status (int): HTTP status of the response.
+            headers (Mapping): All headers of the upstream response.
+
+        Returns:
+            None
+
+        """
+        self.body = body
+        self.status = status
+        self.headers = {name: headers[name] for name in FORWARDED_HEADERS
+                        if headers is not None and name in headers}
+        self._usage = None
+
+    @property
+    def usage(self):
+        """Usage object of the body, extracted once."""
+        if self._usage is None:
+            self._usage = extract_usage(self.body) or {}
+        return self._usage
+
+    @usage.setter
+    def usage(self, usage: dict):
+        """Charge usage counted by the gateway instead of the body's."""
+        self._usage = usage
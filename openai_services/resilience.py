@@ -0,0 +1,264 @@
+"""This module retries failed upstream calls and trips circuit breakers."""
+import asyncio
+import random
+import time
+
+import openai
+
+from logger.ve_logger import VeLogger
+from utils.http_utils import retry_after_seconds
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is known to be unhealthy."""
+
+
+def is_retryable(exception: Exception):
+    """Whether an upstream error may succeed when the call is repeated."""
+    if isinstance(exception, (openai.error.RateLimitError,
+                              openai.error.ServiceUnavailableError,
+                              openai.error.Timeout,
+                              openai.error.APIConnectionError,
+                              openai.error.TryAgain,
+                              asyncio.TimeoutError)):
+        return True
+    if isinstance(exception, openai.error.APIError):
+        return exception.http_status is None or exception.http_status >= 500
+    return False
+
+
+def is_upstream_failure(exception: Exception):
+    """Whether an error tells the upstream is unhealthy.
+
+    A 429 only tells a key is out of quota, so it does not count.
+    """
+    return is_retryable(exception) and \
+        not isinstance(exception, openai.error.RateLimitError)
+
+
+class CircuitBreaker:
+    """Per-circuit breaker of upstream calls.
+
+    A circuit, usually a model, opens after failure_threshold consecutive
+    upstream failures and fails calls fast for recovery_timeout seconds.
+    It then lets half_open_calls trial calls through, closing again on a
+    success and reopening on a failure.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures opening a circuit.
+        recovery_timeout (float): Seconds a circuit stays open.
+        half_open_calls (int): Trial calls let through a half-open circuit.
+
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, failure_threshold: int=5,
+                 recovery_timeout: float=30.0,
+                 half_open_calls: int=1) -> None:
+        """Initializer of class
+
+        Args:
+            failure_threshold (int): Consecutive failures opening a circuit.
+            recovery_timeout (float): Seconds a circuit stays open.
+            half_open_calls (int): Trial calls of a half-open circuit.
+
+        Returns:
+            None
+
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self.circuits = {}
+
+    def _circuit(self, name: str):
+        """Get the state of a circuit, creating it closed."""
+        circuit = self.circuits.get(name)
+        if circuit is None:
+            circuit = {"state": self.CLOSED, "failures": 0, "opened_at": 0.0,
+                       "trials": 0, "opened": 0, "rejected": 0}
+            self.circuits[name] = circuit
+        return circuit
+
+    def before_call(self, name: str):
+        """Admit a call to a circuit
+
+        Args:
+            name (str): Circuit of the call.
+
+        Returns:
+            None
+
+        Raises:
+            CircuitOpenError: When the circuit fails calls fast.
+
+        """
+        circuit = self._circuit(name)
+        if circuit["state"] == self.OPEN:
+            if time.monotonic() - circuit["opened_at"] < \
+                    self.recovery_timeout:
+                circuit["rejected"] += 1
+                raise CircuitOpenError(f"Upstream of {name} is unavailable, " \
+                                       f"try again later.")
+            circuit["state"] = self.HALF_OPEN
+            circuit["trials"] = 0
+        if circuit["state"] == self.HALF_OPEN:
+            if circuit["trials"] >= self.half_open_calls:
+                circuit["rejected"] += 1
+                raise CircuitOpenError(f"Upstream of {name} is recovering, " \
+                                       f"try again later.")
+            circuit["trials"] += 1
+
+    def on_success(self, name: str):
+        """Close a circuit after a successful call."""
+        circuit = self._circuit(name)
+        if circuit["state"] != self.CLOSED:
+            self.logger.info(f"Circuit of {name} closed.")
+        circuit["state"] = self.CLOSED
+        circuit["failures"] = 0
+
+    def on_skip(self, name: str):
+        """Free the trial slot of a call that never reached the upstream."""
+        circuit = self._circuit(name)
+        if circuit["state"] == self.HALF_OPEN and circuit["trials"] > 0:
+            circuit["trials"] -= 1
+
+    def on_failure(self, name: str, exception: Exception):
+        """Count a failed call, opening the circuit when needed."""
+        circuit = self._circuit(name)
+        circuit["failures"] += 1
+        if circuit["state"] == self.HALF_OPEN or \
+                circuit["failures"] >= self.failure_threshold:
+            if circuit["state"] != self.OPEN:
+                circuit["opened"] += 1
+                self.logger.warning(f"Circuit of {name} opened after " \
+                                    f"{exception}")
+            circuit["state"] = self.OPEN
+            circuit["opened_at"] = time.monotonic()
+
+    def stats(self):
+        """Get state of each circuit."""
+        return {name: {key: circuit[key]
+                       for key in ("state", "failures", "opened", "rejected")}
+                for name, circuit in self.circuits.items()}
+
+
+class RetryPolicy:
+    """Bounded retries with jittered exponential backoff.
+
+    A retryable error is retried after a random delay of up to
+    base_delay * 2 ** attempt seconds, capped by max_delay. A `retry-after`
+    header of the error sets the least delay, and a retry-after longer than
+    max_retry_after ends the retries. Calls that are not idempotent are
+    retried only on a 429, which the upstream never processed.
+
+    Attributes:
+        max_retries (int): Retries after the first attempt.
+        base_delay (float): Backoff of the first retry in seconds.
+        max_delay (float): Max backoff in seconds.
+        max_retry_after (float): Longest retry-after honoured in seconds.
+        breaker (CircuitBreaker): Breaker checked before each attempt.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, max_retries: int=3, base_delay: float=0.5,
+                 max_delay: float=8.0, max_retry_after: float=30.0,
+                 breaker: CircuitBreaker=None) -> None:
+        """Initializer of class
+
+        Args:
+            max_retries (int): Retries after the first attempt.
+            base_delay (float): Backoff of the first retry in seconds.
+            max_delay (float): Max backoff in seconds.
+            max_retry_after (float): Longest retry-after honoured.
+            breaker (CircuitBreaker): Breaker checked before each attempt.
+
+        Returns:
+            None
+
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def _delay(self, attempt: int, exception: Exception):
+        """Get seconds to wait before a retry, None to stop retrying."""
+        backoff = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(getattr(exception, "headers", None))
+        if retry_after is None:
+            return backoff
+        if retry_after > self.max_retry_after:
+            return None
+        return max(retry_after, backoff)
+
+    async def call(self, circuit: str, attempt, idempotent: bool=True):
+        """Run an upstream call with retries
+
+        Args:
+            circuit (str): Circuit of the call, usually the model.
+            attempt (callable): Coroutine function making one attempt.
+            idempotent (bool): Whether the call may be repeated after the
+                upstream possibly processed it.
+
+        Returns:
+            any: Result of attempt.
+
+        Raises:
+            CircuitOpenError: When the circuit fails calls fast.
+            Exception: Error of the last attempt.
+
+        """
+        self.calls += 1
+        for retry in range(self.max_retries + 1):
+            if self.breaker is not None:
+                self.breaker.before_call(circuit)
+            try:
+                result = await attempt()
+            except Exception as exception:
+                if self.breaker is not None:
+                    # Any answer but an outage tells the upstream is up
+                    if is_upstream_failure(exception):
+                        self.breaker.on_failure(circuit, exception)
+                    elif isinstance(exception, openai.error.OpenAIError):
+                        self.breaker.on_success(circuit)
+                    else:
+                        self.breaker.on_skip(circuit)
+                if not is_retryable(exception) or (
+                        not idempotent and not isinstance(
+                            exception, openai.error.RateLimitError)):
+                    raise
+                delay = self._delay(retry, exception)
+                if retry == self.max_retries or delay is None:
+                    self.exhausted += 1
+                    raise
+                self.retries += 1
+                self.logger.warning(f"Retrying call of {circuit} in " \
+                                    f"{delay:.2f}s after {exception}")
+                await asyncio.sleep(delay)
+            else:
+                if self.breaker is not None:
+                    self.breaker.on_success(circuit)
+                return result
+
+    def stats(self):
+        """Get retry statistics and circuit states."""
+        return {"calls": self.calls,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "circuits": self.breaker.stats() \
+                            if self.breaker is not None else None}
@@ -0,0 +1,51 @@
+"""This module caches responses of deterministic completion requests."""
+from utils.lru_cache import TTLCache
+from utils.http_utils import payload_hash
+
+
+class ResponseCache:
+    """Exact-match cache of completion responses.
+
+    Only requests that are effectively deterministic are cached, i.e.
+    `temperature` is 0 and the response is not streamed. The key is a hash of
+    the endpoint and the canonical JSON of the request payload.
+
+    Attributes:
+        cache (TTLCache): Cached responses keyed by payload hash.
+
+    """
+
+    def __init__(self, max_size: int=1000, ttl: float=3600.0) -> None:
+        """Initializer of class
+
+        Args:
+            max_size (int): Max number of cached responses.
+            ttl (float): Seconds a response stays cached.
+
+        Returns:
+            None
+
+        """
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def cacheable(payload: dict):
+        """Whether the response of payload is deterministic."""
+        return payload.get("temperature") == 0 and not payload.get("stream")
+
+    @staticmethod
+    def key(endpoint: str, payload: dict):
+        """Hash endpoint and canonical payload into a cache key."""
+        return payload_hash(endpoint, payload)
+
+    def get(self, endpoint: str, payload: dict):
+        """Get the cached response of payload, None on a miss."""
+        return self.cache.get(self.key(endpoint, payload))
+
+    def set(self, endpoint: str, payload: dict, response):
+        """Cache the response of payload."""
+        self.cache.set(self.key(endpoint, payload), response)
+
+    def stats(self):
+        """Get cache statistics."""
+        return self.cache.stats()
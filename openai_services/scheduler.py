@@ -0,0 +1,243 @@
+"""This module shares upstream capacity fairly between users."""
+import asyncio
+import math
+import time
+from collections import deque
+
+
+class CapacityError(Exception):
+    """Raised when a call cannot get an upstream slot in time.
+
+    Attributes:
+        retry_after (float): Seconds after which the call may be retried.
+
+    """
+
+    def __init__(self, message: str, retry_after: float=1.0) -> None:
+        """Initializer of class"""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FairScheduler:
+    """Weighted fair queuing of upstream calls per user.
+
+    At most max_in_flight upstream calls run at once. When they are all
+    taken, requests wait in a queue of their user and free slots go to the
+    user with the smallest virtual start time. Each dispatched call moves
+    its user's virtual time forward by 1 / weight, so a user of weight 2
+    gets twice the slots of a user of weight 1 while both are backlogged,
+    and an idle user does not bank credit. A user never runs more than its
+    max_concurrency calls at once. A call waits at most max_wait seconds and
+    at most max_queue calls wait at once, others fail with CapacityError.
+
+    Attributes:
+        max_in_flight (int): Max upstream calls running at once.
+        default_weight (float): Weight of users without a weight.
+        default_max_concurrency (int): Concurrency cap of users without a
+            cap, None for no cap.
+        max_wait (float): Max seconds a call waits for a slot.
+        max_queue (int): Max calls waiting at once, None for no limit.
+        in_flight (int): Upstream calls running.
+        user_stats (dict): Dispatched and queued calls and queue waits of
+            each user seen.
+
+    """
+
+    def __init__(self, max_in_flight: int=64, default_weight: float=1.0,
+                 default_max_concurrency: int=None, max_wait: float=30.0,
+                 max_queue: int=1000) -> None:
+        """Initializer of class
+
+        Args:
+            max_in_flight (int): Max upstream calls running at once.
+            default_weight (float): Weight of users without a weight.
+            default_max_concurrency (int): Concurrency cap of users without
+                a cap.
+            max_wait (float): Max seconds a call waits for a slot.
+            max_queue (int): Max calls waiting at once.
+
+        Returns:
+            None
+
+        """
+        self.max_in_flight = max_in_flight
+        self.default_weight = default_weight
+        self.default_max_concurrency = default_max_concurrency
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.virtual_time = 0.0
+        self.users = {}
+        # Queue waits per user, kept when idle users are pruned
+        self.user_stats = {}
+        self.dispatched = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _user(self, user_id: str, weight: float=None,
+              max_concurrency: int=None):
+        """Get the state of a user, updating its weight and cap."""
+        user = self.users.get(user_id)
+        if user is None:
+            user = {"queue": deque(), "in_flight": 0, "finish": 0.0}
+            self.users[user_id] = user
+        user["weight"] = weight if weight and weight > 0 \
+                         else self.default_weight
+        user["max_concurrency"] = max_concurrency or \
+                                  self.default_max_concurrency
+        return user
+
+    def _user_stats(self, user_id: str):
+        """Get the queue wait counters of a user."""
+        stats = self.user_stats.get(user_id)
+        if stats is None:
+            stats = {"dispatched": 0, "queued": 0, "wait_total": 0.0,
+                     "wait_max": 0.0}
+            self.user_stats[user_id] = stats
+        return stats
+
+    def _prune(self, user_id: str):
+        """Forget a user without running or waiting calls.
+
+        Its virtual finish time is dropped with it, which gives it at most
+        one call of credit when it comes back. Its counters in user_stats
+        are kept.
+        """
+        user = self.users.get(user_id)
+        if user is not None and user["in_flight"] == 0 and \
+                not user["queue"]:
+            del self.users[user_id]
+
+    def _can_run(self, user: dict):
+        """Whether a user may start one more call."""
+        return self.in_flight < self.max_in_flight and \
+            (user["max_concurrency"] is None or
+             user["in_flight"] < user["max_concurrency"])
+
+    def _dispatch(self, user_id: str, user: dict, wait: float):
+        """Take a slot for a call of user."""
+        start = max(self.virtual_time, user["finish"])
+        user["finish"] = start + 1 / user["weight"]
+        self.virtual_time = start
+        self.in_flight += 1
+        user["in_flight"] += 1
+        self.dispatched += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        stats = self._user_stats(user_id)
+        stats["dispatched"] += 1
+        stats["wait_total"] += wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+
+    def _schedule(self):
+        """Hand free slots to waiting users in virtual time order."""
+        while self.in_flight < self.max_in_flight:
+            ready = [(user_id, user) for user_id, user in self.users.items()
+                     if user["queue"] and self._can_run(user)]
+            if not ready:
+                return
+            user_id, user = min(ready, key=lambda item: max(
+                self.virtual_time, item[1]["finish"]))
+            future, queued_at = user["queue"].popleft()
+            self.waiting -= 1
+            self._dispatch(user_id, user, time.monotonic() - queued_at)
+            future.set_result(None)
+
+    def _abandon(self, user_id: str, entry: tuple):
+        """Take a call that stopped waiting out of the queue."""
+        future, _ = entry
+        if future.done():
+            # The slot was handed over as the waiter gave up
+            self.release(user_id)
+            return
+        future.cancel()
+        user = self.users[user_id]
+        user["queue"].remove(entry)
+        self.waiting -= 1
+        self._prune(user_id)
+
+    async def acquire(self, user_id: str, weight: float=None,
+                      max_concurrency: int=None):
+        """Wait for an upstream slot of a user
+
+        Args:
+            user_id (str): ID of the requesting user.
+            weight (float): Share of the user, default_weight if None.
+            max_concurrency (int): Max calls of the user at once.
+
+        Returns:
+            None
+
+        Raises:
+            CapacityError: When the queue is full or no slot is free within
+                max_wait.
+
+        """
+        user = self._user(user_id, weight, max_concurrency)
+        if not user["queue"] and self._can_run(user):
+            self._dispatch(user_id, user, 0.0)
+            return
+
+        retry_after = max(1, math.ceil(self.max_wait))
+        if self.max_queue is not None and self.waiting >= self.max_queue:
+            self.rejected += 1
+            self._prune(user_id)
+            raise CapacityError("Too many requests are waiting for " \
+                                "upstream capacity.", retry_after)
+
+        entry = (asyncio.get_running_loop().create_future(), time.monotonic())
+        user["queue"].append(entry)
+        self.waiting += 1
+        self.queued += 1
+        self._user_stats(user_id)["queued"] += 1
+        try:
+            await asyncio.wait((entry[0],), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(user_id, entry)
+            raise
+        if not entry[0].done():
+            self.timeouts += 1
+            self._abandon(user_id, entry)
+            raise CapacityError(f"No upstream capacity within " \
+                                f"{self.max_wait:g}s.", retry_after)
+
+    def release(self, user_id: str):
+        """Give the slot of a finished call back."""
+        user = self.users.get(user_id)
+        if user is None or user["in_flight"] == 0:
+            return
+        self.in_flight -= 1
+        user["in_flight"] -= 1
+        self._schedule()
+        self._prune(user_id)
+
+    def stats(self):
+        """Get in-flight calls, queue waits and calls per user."""
+        users = {}
+        for user_id, stats in self.user_stats.items():
+            user = self.users.get(user_id)
+            users[user_id] = {
+                "weight": user["weight"] if user else None,
+                "in_flight": user["in_flight"] if user else 0,
+                "waiting": len(user["queue"]) if user else 0,
+                "dispatched": stats["dispatched"],
+                "queued": stats["queued"],
+                "avg_wait": stats["wait_total"] / stats["dispatched"] \
+                            if stats["dispatched"] else 0.0,
+                "max_wait": stats["wait_max"]}
+        return {"in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "waiting": self.waiting,
+                "dispatched": self.dispatched,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "avg_wait": self.wait_total / self.dispatched \
+                            if self.dispatched else 0.0,
+                "max_wait": self.wait_max,
+                "users": users}
@@ -0,0 +1,54 @@
+"""This module deduplicates identical in-flight upstream requests."""
+import asyncio
+
+
+class SingleFlight:
+    """Share one upstream call between concurrent identical requests.
+
+    The first request of a key starts the call as a task, requests of the
+    same key arriving while it runs wait for that task. Its result, or its
+    error, is handed to every waiter. A cancelled waiter does not cancel the
+    shared call.
+
+    Attributes:
+        calls (int): Number of upstream calls made.
+        shared (int): Number of requests served by another request's call.
+
+    """
+
+    def __init__(self) -> None:
+        """Initializer of class"""
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: str, create, *args, **kwargs):
+        """Run create once for all concurrent callers of key
+
+        Args:
+            key (str): Key identifying identical requests.
+            create (callable): Coroutine function making the upstream call.
+            *args, **kwargs: Arguments of create.
+
+        Returns:
+            any: Result of create.
+
+        Raises:
+            Exception: Error of create.
+
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(create(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """Get single-flight statistics."""
+        return {"inflight": len(self._inflight),
+                "calls": self.calls,
+                "shared": self.shared}
@@ -0,0 +1,137 @@
+"""This module counts tokens with cached tiktoken encoders."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import tiktoken
+
+from logger.ve_logger import VeLogger
+
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+class Tokenizer:
+    """Registry of tiktoken encoders with batch token counting.
+
+    Encoders are resolved once per model and kept for the life of the
+    process. Models unknown to tiktoken fall back to DEFAULT_ENCODING.
+
+    Attributes:
+        batch_threshold (int): Batches larger than this are counted on the
+            thread pool instead of the event loop.
+
+    """
+
+    # Initialize logger
+    logger = VeLogger()
+
+    def __init__(self, threads: int=4, batch_threshold: int=64) -> None:
+        """Initializer of class
+
+        Args:
+            threads (int): Number of threads counting large batches.
+            batch_threshold (int): Batch size counted on the thread pool.
+
+        Returns:
+            None
+
+        """
+        self.batch_threshold = batch_threshold
+        self._threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads,
+                                            thread_name_prefix="tokenizer")
+        self._encodings = {}
+
+    def encoding(self, model: str):
+        """Get the encoder of a model."""
+        encoding = self._encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            self._encodings[model] = encoding
+        return encoding
+
+    def warm(self, models: list):
+        """Load encoders of models ahead of the first request."""
+        for model in models:
+            try:
+                self.encoding(model)
+            except Exception as exception:
+                self.logger.warning(f"Loading tokenizer of {model} failed " \
+                                    f"with {exception}")
+
+    def count(self, text: str, model: str):
+        """Count tokens of a text."""
+        return len(self.encoding(model).encode_ordinary(text))
+
+    def count_texts(self, texts: list, model: str):
+        """Count tokens of each text of a list on the calling thread."""
+        encoding = self.encoding(model)
+        return [len(encoding.encode_ordinary(text)) for text in texts]
+
+    def count_messages(self, messages: list, model: str):
+        """Count prompt tokens of chat messages
+
+        Follows the per-message overhead of the chat format: every message
+        costs extra tokens for its role markers, a `name` changes that cost
+        and the reply is primed with a few more tokens.
+
+        Args:
+            messages (list): Chat messages.
+            model (str): Chat model.
+
+        Returns:
+            int: number of prompt tokens.
+
+        """
+        if model.startswith("gpt-3.5-turbo-0301"):
+            tokens_per_message, tokens_per_name = 4, -1
+        else:
+            tokens_per_message, tokens_per_name = 3, 1
+
+        encoding = self.encoding(model)
+        num_tokens = 3
+        for message in messages:
+            num_tokens += tokens_per_message
+            for key, value in message.items():
+                num_tokens += len(encoding.encode_ordinary(str(value)))
+                if key == "name":
+                    num_tokens += tokens_per_name
+        return num_tokens
+
+    async def acount_texts(self, texts: list, model: str):
+        """Count tokens of each text, on the thread pool for large batches.
+
+        A large batch is split into one slice per thread of the pool, which
+        count in parallel since tiktoken releases the GIL while encoding.
+        """
+        if len(texts) <= self.batch_threshold:
+            return self.count_texts(texts, model)
+        loop = asyncio.get_running_loop()
+        size = -(-len(texts) // self._threads)
+        counts = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self.count_texts,
+                                 texts[start:start + size], model)
+            for start in range(0, len(texts), size)))
+        return [count for chunk in counts for count in chunk]
+
+    async def acount_messages(self, messages: list, model: str):
+        """Count prompt tokens of chat messages, on the thread pool for
+        long conversations."""
+        if len(messages) <= self.batch_threshold:
+            return self.count_messages(messages, model)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          self.count_messages,
+                                          messages, model)
+
+    async def run(self, function, *args):
+        """Run a counting function on the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def close(self):
+        """Shut the thread pool down."""
+        self._executor.shutdown(wait=False)
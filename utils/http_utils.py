@@ -0,0 +1,74 @@
+"""Utils functions for http requests."""
+import hashlib
+import json
+
+
+def use_response_cache(cache_control: str=None) -> bool:
+    """Whether a request allows to be served from the response cache
+
+    Args:
+        cache_control (str): Value of the Cache-Control header.
+
+    Returns:
+        bool: False if the header contains no-cache or no-store.
+
+    """
+    if not cache_control:
+        return True
+    directives = {directive.strip().lower()
+                  for directive in cache_control.split(",")}
+    return not directives & {"no-cache", "no-store"}
+
+
+def payload_hash(endpoint: str, payload: dict) -> str:
+    """Hash endpoint and canonical JSON of a request payload
+
+    Args:
+        endpoint (str): Name of the endpoint.
+        payload (dict): Request payload.
+
+    Returns:
+        str: Hex digest identifying identical requests.
+
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{endpoint}\0{canonical}".encode()).hexdigest()
+
+
+def retry_after_seconds(headers) -> float:
+    """Get seconds of a retry-after header
+
+    Args:
+        headers (Mapping): Response headers, may be None.
+
+    Returns:
+        float: seconds to wait, None if the header is missing or is not a
+            number of seconds.
+
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag
+
+    Args:
+        if_none_match (str): Value of the If-None-Match header.
+        etag (str): Current ETag of the resource.
+
+    Returns:
+        bool: True if the client copy is still valid.
+
+    """
+    if not if_none_match or not etag:
+        return False
+    candidates = {candidate.strip().removeprefix("W/")
+                  for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,135 @@
+"""Bounded in-process cache with LRU eviction and TTL expiry."""
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries expire after a TTL.
+
+    The cache is not thread-safe. It is meant to be used from the event loop,
+    where no other coroutine can run between its operations.
+
+    Attributes:
+        max_size (int): Maximum number of entries kept in the cache.
+        ttl (float): Seconds an entry stays valid after it is set.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found or expired.
+
+    """
+
+    def __init__(self, max_size: int=1024, ttl: float=60.0) -> None:
+        """Initializer of class
+
+        Args:
+            max_size (int): Maximum number of entries kept in the cache.
+            ttl (float): Seconds an entry stays valid after it is set.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: When max_size is not positive.
+
+        """
+        if max_size <= 0:
+            raise ValueError("max_size of cache should be positive.")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        """Return the (expires, value) item of key or None if expired."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key, default=None):
+        """Get value of key and mark it as recently used.
+
+        Args:
+            key (hashable): Key to look up.
+            default (any): Value to return on a miss.
+
+        Returns:
+            any: Cached value or default.
+
+        """
+        item = self._lookup(key)
+        if item is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, key, value, ttl: float=None):
+        """Set value of key, evicting the least recently used entry if full.
+
+        Args:
+            key (hashable): Key to set.
+            value (any): Value to store.
+            ttl (float): Overrides the default TTL for this entry.
+
+        Returns:
+            None
+
+        """
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove key from the cache and return its value."""
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        return item[1]
+
+    def pop_where(self, predicate):
+        """Remove all entries whose value matches predicate.
+
+        Args:
+            predicate (callable): Called with each value.
+
+        Returns:
+            int: Number of removed entries.
+
+        """
+        keys = [key for key, (_, value) in self._data.items()
+                if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """Remove all entries."""
+        self._data.clear()
+
+    def stats(self):
+        """Get cache statistics
+
+        Returns:
+            dict: size, hits, misses and hit rate of the cache.
+
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,80 @@
+"""Utils functions to serve the app with one or more worker processes."""
+import uvicorn
+
+from configs.service_config import ServiceConfig
+
+
+def serve(app, service_config: ServiceConfig, app_uri: str="app:app"):
+    """Serve an ASGI app as configured by service_config
+
+    With gunicorn installed, a master process binds the socket and forks
+    service_config.workers uvicorn workers, importing the app before the
+    fork when service_config.preload is set. Each worker runs the lifespan
+    of the app, so connections are opened after the fork. Signals of the
+    master:
+
+    * HUP starts new workers and drains the old ones within
+      graceful_timeout, without dropping connections. Without preload, the
+      new workers import the new code.
+    * TERM drains all workers within graceful_timeout and exits.
+
+    USR2 upgrades, which replace the master process, are not used: entry.sh
+    watches the master it started and turns USR2 into HUP.
+
+    Without gunicorn, uvicorn serves the app, with its own workers when
+    service_config.workers is above 1, which import the app themselves.
+
+    Args:
+        app (FastAPI): The app to serve.
+        service_config (ServiceConfig): Configs of the service.
+        app_uri (str): Import string of the app, for workers that import
+            it themselves.
+
+    Returns:
+        None
+
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+        from uvicorn.workers import UvicornWorker
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is None:
+        uvicorn.run(app_uri if service_config.workers > 1 else app,
+                    host=service_config.host,
+                    port=service_config.port,
+                    workers=service_config.workers,
+                    loop=service_config.loop,
+                    http=service_config.http,
+                    timeout_keep_alive=service_config.keepalive_timeout,
+                    timeout_graceful_shutdown=service_config.graceful_timeout)
+        return
+
+    class Worker(UvicornWorker):
+        """Uvicorn worker using the loop and protocol of the config."""
+        CONFIG_KWARGS = {"loop": service_config.loop,
+                         "http": service_config.http}
+
+    class Application(BaseApplication):
+        """Gunicorn application serving the app."""
+
+        def load_config(self):
+            options = {
+                "bind": f"{service_config.host}:{service_config.port}",
+                "workers": service_config.workers,
+                "worker_class": Worker,
+                "preload_app": service_config.preload,
+                "graceful_timeout": service_config.graceful_timeout,
+                "keepalive": service_config.keepalive_timeout,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if service_config.preload:
+                return app
+            from gunicorn.util import import_app
+            return import_app(app_uri)
+
+    Application().run()
@@ -0,0 +1,38 @@
+"""Utils classes for streamed http responses."""
+import asyncio
+
+from fastapi.responses import StreamingResponse
+
+
+class SettledStreamingResponse(StreamingResponse):
+    """Streaming response that settles its stream however it ends.
+
+    The settle coroutine function runs once the response is over, also when
+    the client disconnected before or while the body was sent. It runs as a
+    shielded task, so cancelling the response does not interrupt it.
+
+    Attributes:
+        settle (callable): Coroutine function run after the response.
+
+    """
+
+    def __init__(self, content, settle, **kwargs) -> None:
+        """Initializer of class
+
+        Args:
+            content (AsyncIterable): Body of the response.
+            settle (callable): Coroutine function run after the response.
+            **kwargs: Arguments of StreamingResponse.
+
+        Returns:
+            None
+
+        """
+        super().__init__(content, **kwargs)
+        self.settle = settle
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await asyncio.shield(asyncio.ensure_future(self.settle()))